@@ -0,0 +1,76 @@
+"""case-insensitive unique email
+
+Revision ID: 5b1f0e7d2a94
+Revises: c883c9de8696
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0e7d2a94'
+down_revision: Union[str, None] = 'c883c9de8696'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _index_valid(name: str) -> Optional[bool]:
+    """pg_index.indisvalid of an index, None when it does not exist"""
+    return op.get_bind().execute(
+        sa.text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name},
+    ).scalar()
+
+
+def upgrade() -> None:
+    # Emails equal after normalization: the oldest account keeps the address,
+    # the others are renamed out of the way and banned for manual review
+    op.execute("""
+        UPDATE users_base AS u
+        SET email = lower(btrim(u.email)) || '.duplicate-' || u.id,
+            is_banned = true
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY lower(btrim(email)) ORDER BY created_at, id) AS position
+            FROM users_base
+        ) AS d
+        WHERE u.id = d.id AND d.position > 1
+    """)
+    op.execute("UPDATE users_base SET email = lower(btrim(email)) WHERE email <> lower(btrim(email))")
+
+    # CONCURRENTLY keeps users_base writable while the index builds. A build
+    # that failed (e.g. a duplicate inserted by the old app meanwhile) leaves
+    # an INVALID index, which is dropped and rebuilt on the next run.
+    with op.get_context().autocommit_block():
+        if _index_valid('ix_users_base_email_lower') is False:
+            op.drop_index('ix_users_base_email_lower', table_name='users_base', postgresql_concurrently=True)
+
+        if _index_valid('ix_users_base_email_lower') is None:
+            op.create_index(
+                'ix_users_base_email_lower',
+                'users_base',
+                [sa.text('lower(email)')],
+                unique=True,
+                postgresql_concurrently=True,
+            )
+
+        if not _index_valid('ix_users_base_email_lower'):
+            raise RuntimeError("ix_users_base_email_lower is not valid, keeping ix_users_base_email; rerun the migration")
+        op.drop_index('ix_users_base_email', table_name='users_base', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    # Emails stay lower-cased and renamed duplicates are not restored
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_base_email',
+            'users_base',
+            ['email'],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index('ix_users_base_email_lower', table_name='users_base', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,54 @@
+"""add admin search indexes
+
+Revision ID: c883c9de8696
+Revises: 44ca8a20be05
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c883c9de8696'
+down_revision: Union[str, None] = '44ca8a20be05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY keeps users_base writable while the indexes build
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_users_base_created_at_id',
+            'users_base',
+            ['created_at', 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_users_base_last_login',
+            'users_base',
+            ['last_login'],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_users_base_email_trgm',
+            'users_base',
+            ['email'],
+            postgresql_using='gin',
+            postgresql_ops={'email': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_users_base_email_trgm', table_name='users_base', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_base_last_login', table_name='users_base', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_users_base_created_at_id', table_name='users_base', postgresql_concurrently=True, if_exists=True)
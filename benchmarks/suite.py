@@ -0,0 +1,128 @@
+import asyncio
+from datetime import datetime, timezone
+
+from .runner import benchmark
+
+from src.backend.auth.cache import CachedUser, encode_user, decode_user
+from src.backend.auth.dependencies import TokenVerifier
+from src.backend.auth.hashing import pwd_context
+from src.backend.auth.models import UserBaseModel
+from src.backend.auth.schemas import UserBaseSchema
+from src.backend.auth.service import AuthService
+from src.backend.database import LocalTTLCache
+from src.backend.email.html import render
+
+USER = CachedUser(
+    id=42,
+    email="bench@holdmybeer.fun",
+    hash_password=pwd_context.handler("bcrypt").using(rounds=4).hash("benchmark"),
+    is_banned=False,
+    permissions=0,
+    verification_status=1,
+    created_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    last_login=datetime(2025, 6, 1, tzinfo=timezone.utc),
+)
+
+
+for rounds in (4, 8, 10, 12):
+    def _hash_setup(rounds=rounds):
+        context = pwd_context.handler("bcrypt").using(rounds=rounds)
+        return lambda: context.hash("correct horse battery staple")
+
+    def _verify_setup(rounds=rounds):
+        context = pwd_context.handler("bcrypt").using(rounds=rounds)
+        hashed = context.hash("correct horse battery staple")
+        return lambda: context.verify("correct horse battery staple", hashed)
+
+    benchmark(f"password_hasher[rounds={rounds}]")(_hash_setup)
+    benchmark(f"password_checker[rounds={rounds}]")(_verify_setup)
+
+
+@benchmark("password_checker[pool]")
+def _pool_verify_setup():
+    from src.backend.auth.hashing import PasswordHashingPool
+
+    pool = PasswordHashingPool(max_workers=1, max_queue=1, timeout=30)
+    loop = asyncio.new_event_loop()
+    try:
+        yield lambda: loop.run_until_complete(pool.verify("benchmark", USER.hash_password))
+    finally:
+        loop.run_until_complete(pool.shutdown())
+        loop.close()
+
+
+@benchmark("create_tokens")
+def _create_tokens_setup():
+    return lambda: AuthService._create_tokens({"email": USER.email, "fid": "f" * 32}, "j" * 32)
+
+
+@benchmark("jwt_decode[uncached]")
+def _jwt_decode_setup():
+    token = AuthService._create_tokens({"email": USER.email, "fid": "f" * 32}, "j" * 32).access_token
+    verifier = TokenVerifier(LocalTTLCache(maxsize=1, ttl=0))
+    return lambda: verifier.verify(token)
+
+
+@benchmark("jwt_decode[cached]")
+def _jwt_decode_cached_setup():
+    token = AuthService._create_tokens({"email": USER.email, "fid": "f" * 32}, "j" * 32).access_token
+    verifier = TokenVerifier(LocalTTLCache(maxsize=16, ttl=60))
+    verifier.verify(token)
+    return lambda: verifier.verify(token)
+
+
+@benchmark("user_cache_encode")
+def _encode_setup():
+    return lambda: encode_user(USER, 0.0)
+
+
+@benchmark("user_cache_decode")
+def _decode_setup():
+    payload = encode_user(USER, 0.0)
+    return lambda: decode_user(payload)
+
+
+@benchmark("model_dump")
+def _model_dump_setup():
+    model = UserBaseModel(
+        id=USER.id,
+        email=USER.email,
+        hash_password=USER.hash_password,
+        is_banned=USER.is_banned,
+        permissions=USER.permissions,
+        verification_status=USER.verification_status,
+        created_at=USER.created_at,
+        last_login=USER.last_login,
+    )
+    return model.model_dump
+
+
+@benchmark("user_schema_from_orm")
+def _from_orm_setup():
+    return lambda: UserBaseSchema.from_orm(USER)
+
+
+@benchmark("challenge_html_render")
+def _render_setup():
+    return lambda: render("register", {"CODE": "123456"})
+
+
+@benchmark("email_dispatch[batch=50]")
+def _dispatch_setup():
+    from src.backend.email.dispatcher import BatchingDispatcher
+    from src.backend.email.transport import EmailMessage, InMemoryTransport
+
+    messages = [
+        EmailMessage(f"user{index}@holdmybeer.fun", "Verification Code", "", "register", {"CODE": "123456"})
+        for index in range(50)
+    ]
+    loop = asyncio.new_event_loop()
+
+    async def dispatch() -> None:
+        dispatcher = BatchingDispatcher(InMemoryTransport(), max_batch=50, max_delay=0.05)
+        await asyncio.gather(*(dispatcher.send(message) for message in messages))
+
+    try:
+        yield lambda: loop.run_until_complete(dispatch())
+    finally:
+        loop.close()
@@ -0,0 +1,2 @@
+from .endpoints import admin_router
+from .dependencies import AdminUser
@@ -0,0 +1,18 @@
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, status
+
+from ..auth import CurrentUser
+from ..auth.cache import CachedUser
+from ..auth.enums import UserPermissionRole
+
+
+async def get_admin_user(user: CurrentUser) -> CachedUser:
+    """Allow the request only for users with the admin role"""
+    if user.permissions != UserPermissionRole.ADMIN.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin permission required")
+
+    return user
+
+
+AdminUser = Annotated[CachedUser, Depends(get_admin_user)]
@@ -0,0 +1,45 @@
+import json
+import logging
+from datetime import datetime
+from typing import Annotated, Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from .dependencies import AdminUser, get_admin_user
+from .repository import AdminUserRepository
+from .schemas import AdminUserSchema, UserFilterSchema, UserListQuerySchema, UserPageSchema
+
+logger = logging.getLogger(__name__)
+admin_router = APIRouter(tags=["admin"], dependencies=[Depends(get_admin_user)])
+
+
+def _json_default(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+@admin_router.get("/users", response_model=UserPageSchema)
+async def list_users(query: Annotated[UserListQuerySchema, Query()]):
+    rows, next_cursor = await AdminUserRepository.page(query, query.cursor, query.limit)
+    return UserPageSchema(
+        items=[AdminUserSchema.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+    )
+
+
+@admin_router.get("/users/export")
+async def export_users(admin: AdminUser, filters: Annotated[UserFilterSchema, Query()]):
+    """Every matching user as NDJSON, streamed without buffering the result"""
+    # get_admin_user is cached per request, so this reuses the router's check
+    logger.info(f"Admin {admin.email} started a user export.")
+
+    async def lines() -> AsyncIterator[str]:
+        count = 0
+        async for row in AdminUserRepository.stream(filters):
+            count += 1
+            yield json.dumps(dict(row), default=_json_default) + "\n"
+        logger.info(f"Admin export streamed {count} users.")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
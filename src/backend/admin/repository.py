@@ -0,0 +1,114 @@
+import json
+import base64
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import Row, Select, select, tuple_
+
+from .schemas import UserFilterSchema
+from ..auth.models import UserBaseModel
+from ..database import ReadSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Everything but the password hash
+LIST_COLUMNS = (
+    UserBaseModel.id,
+    UserBaseModel.email,
+    UserBaseModel.is_banned,
+    UserBaseModel.permissions,
+    UserBaseModel.verification_status,
+    UserBaseModel.created_at,
+    UserBaseModel.last_login,
+)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(row: Row) -> str:
+    """Opaque keyset cursor pointing just past a row"""
+    raw = json.dumps([row.created_at.isoformat(), row.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, user_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+class AdminUserRepository:
+    """Read-only user queries for the admin API
+
+    Results are ordered by (created_at, id), which the composite index serves
+    directly; pages continue from the last row seen instead of using OFFSET,
+    so every page costs the same no matter how deep it is. Queries run on a
+    read replica when one is configured.
+    """
+
+    @staticmethod
+    def _statement(filters: UserFilterSchema) -> Select:
+        statement = select(*LIST_COLUMNS)
+
+        if filters.email_prefix:
+            statement = statement.where(UserBaseModel.email.like(_escape_like(filters.email_prefix.lower()) + "%", escape="\\"))
+        if filters.email_contains:
+            statement = statement.where(UserBaseModel.email.ilike("%" + _escape_like(filters.email_contains) + "%", escape="\\"))
+        if filters.verification_status is not None:
+            statement = statement.where(UserBaseModel.verification_status == filters.verification_status)
+        if filters.is_banned is not None:
+            statement = statement.where(UserBaseModel.is_banned == filters.is_banned)
+        if filters.created_after:
+            statement = statement.where(UserBaseModel.created_at >= filters.created_after)
+        if filters.created_before:
+            statement = statement.where(UserBaseModel.created_at < filters.created_before)
+        if filters.last_login_after:
+            statement = statement.where(UserBaseModel.last_login >= filters.last_login_after)
+        if filters.last_login_before:
+            statement = statement.where(UserBaseModel.last_login < filters.last_login_before)
+
+        if filters.order == "desc":
+            return statement.order_by(UserBaseModel.created_at.desc(), UserBaseModel.id.desc())
+        return statement.order_by(UserBaseModel.created_at.asc(), UserBaseModel.id.asc())
+
+    @staticmethod
+    async def page(
+        filters: UserFilterSchema,
+        cursor: Optional[str],
+        limit: int,
+    ) -> tuple[list[Row], Optional[str]]:
+        """One page of users and the cursor of the next page, if any"""
+        statement = AdminUserRepository._statement(filters)
+
+        if cursor:
+            key = tuple_(UserBaseModel.created_at, UserBaseModel.id)
+            position = tuple_(*decode_cursor(cursor))
+            statement = statement.where(key < position if filters.order == "desc" else key > position)
+
+        async with ReadSessionLocal() as session:
+            rows = (await session.execute(statement.limit(limit + 1))).all()
+
+        if len(rows) > limit:
+            rows = rows[:limit]
+            return rows, encode_cursor(rows[-1])
+        return rows, None
+
+    @staticmethod
+    async def stream(filters: UserFilterSchema, batch_size: int = 1000) -> AsyncIterator[dict[str, Any]]:
+        """Every matching user through a server-side cursor, in its own session
+
+        The session outlives the request dependencies, which are closed before
+        a streaming response body is sent.
+        """
+        statement = AdminUserRepository._statement(filters).execution_options(yield_per=batch_size)
+
+        async with ReadSessionLocal() as session:
+            result = await session.stream(statement)
+            async for row in result.mappings():
+                yield row
@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class UserFilterSchema(BaseModel):
+    email_prefix: Optional[str] = Field(None, min_length=3)
+    email_contains: Optional[str] = Field(None, min_length=3)
+    verification_status: Optional[int] = None
+    is_banned: Optional[bool] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+    last_login_after: Optional[datetime] = None
+    last_login_before: Optional[datetime] = None
+    order: Literal["asc", "desc"] = "desc"
+
+
+class UserListQuerySchema(UserFilterSchema):
+    cursor: Optional[str] = None
+    limit: int = Field(50, ge=1, le=500)
+
+
+class AdminUserSchema(BaseModel):
+    id: int
+    email: str
+    is_banned: bool
+    permissions: int
+    verification_status: int
+    created_at: datetime
+    last_login: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class UserPageSchema(BaseModel):
+    items: list[AdminUserSchema]
+    next_cursor: Optional[str]
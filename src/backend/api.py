@@ -2,11 +2,15 @@ import logging
 
 from fastapi import APIRouter
 
+from .admin import admin_router
 from .auth import auth_router
 from .email import email_router
+from .monitoring import monitoring_router
 
 logger = logging.getLogger(__name__)
 
 api_router = APIRouter(tags=["api"])
 api_router.include_router(auth_router, prefix="/auth")
-api_router.include_router(email_router, prefix="/email")
\ No newline at end of file
+api_router.include_router(admin_router, prefix="/admin")
+api_router.include_router(email_router, prefix="/email")
+api_router.include_router(monitoring_router, prefix="/monitoring")
\ No newline at end of file
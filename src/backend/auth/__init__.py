@@ -1,3 +1,4 @@
 from .endpoints import auth_router
 from .exceptions import *
 from .service import AuthService
+from .dependencies import CurrentPrincipal, CurrentUser, Principal
@@ -0,0 +1,444 @@
+import json
+import math
+import time
+import uuid
+import random
+import struct
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Optional
+
+from .models import UserBaseModel
+from ..database import get_redis, get_redis_binary, subscriber, LocalTTLCache, RedisScript, redis_breaker
+from ..metrics import CACHE_FALLBACKS, USER_CACHE_LOOKUPS
+from ..settings import get_settings
+from ..tasks import spawn
+
+logger = logging.getLogger(__name__)
+
+USER_INVALIDATION_CHANNEL = "user:invalidate"
+CACHE_SCHEMA_VERSION = 2
+
+# version, soft expiry, id, is_banned, permissions, verification_status,
+# created_at, last_login (epoch seconds, NaN for None), email length, hash length
+_USER_HEADER = struct.Struct("!Bdq?BBddHH")
+
+# Returned by UserCache._redis when Redis could not answer
+_UNAVAILABLE = object()
+
+# Negative entries: the email is known not to be registered. The Redis
+# payload has version 0, which no encoded user ever has.
+_MISSING = object()
+_NEGATIVE_PAYLOAD = b"\x00"
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+UserLoader = Callable[[], Awaitable[Optional[UserBaseModel]]]
+
+_LOCAL_HITS = USER_CACHE_LOOKUPS.labels("local_hit")
+_REDIS_HITS = USER_CACHE_LOOKUPS.labels("redis_hit")
+_STALE_HITS = USER_CACHE_LOOKUPS.labels("stale_hit")
+_NEGATIVE_HITS = USER_CACHE_LOOKUPS.labels("negative_hit")
+_MISSES = USER_CACHE_LOOKUPS.labels("miss")
+
+
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    """Read-only user value returned on cache hits instead of an ORM instance"""
+
+    id: int
+    email: str
+    hash_password: str
+    is_banned: bool
+    permissions: int
+    verification_status: int
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+    @classmethod
+    def from_model(cls, user: UserBaseModel) -> "CachedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            hash_password=user.hash_password,
+            is_banned=user.is_banned,
+            permissions=getattr(user.permissions, "value", user.permissions),
+            verification_status=getattr(user.verification_status, "value", user.verification_status),
+            created_at=user.created_at,
+            last_login=user.last_login,
+        )
+
+
+def _to_epoch(value: Optional[datetime]) -> float:
+    return value.timestamp() if value is not None else math.nan
+
+
+def _from_epoch(value: float) -> Optional[datetime]:
+    return None if math.isnan(value) else datetime.fromtimestamp(value, timezone.utc)
+
+
+def encode_user(user: CachedUser, soft_expires_at: float = math.inf) -> bytes:
+    """Pack a user into the versioned binary cache layout"""
+    email = user.email.encode()
+    hash_password = user.hash_password.encode()
+
+    return _USER_HEADER.pack(
+        CACHE_SCHEMA_VERSION,
+        soft_expires_at,
+        user.id,
+        user.is_banned,
+        user.permissions,
+        user.verification_status,
+        _to_epoch(user.created_at),
+        _to_epoch(user.last_login),
+        len(email),
+        len(hash_password),
+    ) + email + hash_password
+
+
+def decode_user(payload: bytes) -> tuple[CachedUser, float]:
+    """Unpack a user and its soft expiry from the versioned binary cache layout"""
+    (
+        version, soft_expires_at, user_id, is_banned, permissions, verification_status,
+        created_at, last_login, email_length, hash_length,
+    ) = _USER_HEADER.unpack_from(payload)
+
+    if version != CACHE_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported user cache version: {version}")
+
+    offset = _USER_HEADER.size
+    email = payload[offset:offset + email_length].decode()
+    offset += email_length
+    hash_password = payload[offset:offset + hash_length].decode()
+
+    user = CachedUser(
+        id=user_id,
+        email=email,
+        hash_password=hash_password,
+        is_banned=is_banned,
+        permissions=permissions,
+        verification_status=verification_status,
+        created_at=_from_epoch(created_at),
+        last_login=_from_epoch(last_login),
+    )
+    return user, soft_expires_at
+
+
+class UserCache:
+    """Two-tier user cache: in-process LRU in front of Redis
+
+    Redis entries carry a soft expiry inside the payload and a jittered hard
+    expiry on the key. Past the soft expiry the stale user is still served
+    while a single caller refreshes it in the background. Concurrent misses
+    for the same email are coalesced in-process and, through a short Redis
+    lock, across workers.
+    """
+
+    def __init__(
+        self,
+        local: LocalTTLCache,
+        soft_ttl: float,
+        hard_ttl: float,
+        jitter: float,
+        lock_ttl_ms: int,
+        negative_ttl: float,
+    ) -> None:
+        self.local = local
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.jitter = jitter
+        self.lock_ttl_ms = lock_ttl_ms
+        self.negative_ttl = negative_ttl
+        self.origin = uuid.uuid4().hex
+
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._refreshing: set[str] = set()
+        self._release_lock = RedisScript(_RELEASE_LOCK_SCRIPT)
+        self.coalesced = 0
+        self.stale_served = 0
+        self.refreshes = 0
+        self.negative_stored = 0
+
+    @staticmethod
+    def _key(email: str) -> str:
+        return f"user:v{CACHE_SCHEMA_VERSION}:{email}"
+
+    @staticmethod
+    def _lock_key(email: str) -> str:
+        return f"user:lock:{email}"
+
+    def _jittered(self, ttl: float) -> float:
+        return ttl * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    @staticmethod
+    async def _redis(operation: str, call: Callable[[], Awaitable[Any]], default: Any = None) -> Any:
+        """Run a Redis call through the circuit breaker, returning default if Redis is unavailable
+
+        Every failure here degrades to the database path instead of failing
+        the request, so a Redis incident costs latency rather than logins.
+        """
+        try:
+            return await redis_breaker.call(call)
+        except Exception as exc:
+            CACHE_FALLBACKS.labels(operation).inc()
+            logger.debug(f"User cache {operation} skipped: {exc!r}")
+            return default
+
+    async def _read(self, email: str) -> Optional[tuple[CachedUser, float]] | object:
+        """Decoded entry, _MISSING for a negative entry or None on a miss"""
+        payload = await self._redis("read", lambda: get_redis_binary().get(self._key(email)))
+        if not payload:
+            return None
+        if payload == _NEGATIVE_PAYLOAD:
+            return _MISSING
+
+        try:
+            return decode_user(payload)
+        except (ValueError, struct.error):
+            logger.warning(f"Discarding unreadable cache entry for {email}")
+            return None
+
+    async def get(self, email: str) -> Optional[CachedUser]:
+        """Return a cached user, checking the local tier first"""
+        user = self.local.get(email)
+        if user is not None:
+            return None if user is _MISSING else user
+
+        entry = await self._read(email)
+        if entry is None:
+            return None
+        if entry is _MISSING:
+            self._set_local_missing(email)
+            return None
+
+        user, _ = entry
+        self.local.set(email, user)
+        return user
+
+    async def get_or_load(
+        self,
+        email: str,
+        load: UserLoader,
+        refresh: UserLoader,
+    ) -> Optional[CachedUser]:
+        """Return a cached user, loading it once on a miss
+
+        ``load`` runs in the caller's context on a miss; ``refresh`` must open
+        its own database session since it runs after the request returns.
+        """
+        user = self.local.get(email)
+        if user is _MISSING:
+            _NEGATIVE_HITS.inc()
+            return None
+        if user is not None:
+            _LOCAL_HITS.inc()
+            return user
+
+        entry = await self._read(email)
+        if entry is _MISSING:
+            _NEGATIVE_HITS.inc()
+            self._set_local_missing(email)
+            return None
+        if entry is not None:
+            user, soft_expires_at = entry
+            if soft_expires_at <= time.time():
+                self.stale_served += 1
+                _STALE_HITS.inc()
+                if email not in self._refreshing:
+                    self._refreshing.add(email)
+                    spawn(self._refresh(email, refresh), name=f"user-refresh:{email}")
+            else:
+                _REDIS_HITS.inc()
+            self.local.set(email, user)
+            return user
+
+        _MISSES.inc()
+
+        inflight = self._inflight.get(email)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[email] = future
+        try:
+            user = await self._load_locked(email, load)
+            future.set_result(user)
+            return user
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark as retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(email, None)
+
+    async def _load_locked(self, email: str, load: UserLoader) -> Optional[CachedUser]:
+        """Load a user from the database, letting only one worker hit it at a time"""
+        token = uuid.uuid4().hex
+        lock_key = self._lock_key(email)
+
+        acquired = await self._redis(
+            "lock",
+            lambda: get_redis().set(lock_key, token, nx=True, px=self.lock_ttl_ms),
+            default=_UNAVAILABLE,
+        )
+        if acquired is _UNAVAILABLE:
+            return await self._load(email, load)
+
+        if not acquired:
+            deadline = time.monotonic() + self.lock_ttl_ms / 1000
+            while time.monotonic() < deadline and not redis_breaker.is_open:
+                await asyncio.sleep(0.02)
+                entry = await self._read(email)
+                if entry is _MISSING:
+                    self.coalesced += 1
+                    self._set_local_missing(email)
+                    return None
+                if entry is not None:
+                    self.coalesced += 1
+                    self.local.set(email, entry[0])
+                    return entry[0]
+
+            return await self._load(email, load)
+
+        try:
+            return await self._load(email, load)
+        finally:
+            await self._redis("unlock", lambda: self._release_lock(keys=[lock_key], args=[token]))
+
+    async def _load(self, email: str, load: UserLoader) -> Optional[CachedUser]:
+        user = await load()
+        if user is None:
+            self.set_missing(email)
+            return None
+        return await self.set(user)
+
+    def _set_local_missing(self, email: str) -> None:
+        self.local.set(email, _MISSING, ttl=min(self.local.ttl, self.negative_ttl))
+
+    def set_missing(self, email: str) -> None:
+        """Remember briefly that an email is not registered
+
+        The Redis write uses NX, so it never replaces a user that was stored
+        concurrently; a registration overwrites the negative entry with a
+        plain SET and its broadcast evicts local copies on other workers.
+        """
+        self._set_local_missing(email)
+        self.negative_stored += 1
+        spawn(
+            self._redis(
+                "write",
+                lambda: get_redis_binary().set(self._key(email), _NEGATIVE_PAYLOAD, ex=int(self.negative_ttl), nx=True),
+            ),
+            name=f"user-store-missing:{email}",
+        )
+
+    async def _refresh(self, email: str, refresh: UserLoader) -> None:
+        """Reload a stale entry unless another worker is already doing it
+
+        Only one refresh per email runs in this process (see _refreshing).
+        """
+        token = uuid.uuid4().hex
+        lock_key = self._lock_key(email)
+
+        try:
+            if not await self._redis("lock", lambda: get_redis().set(lock_key, token, nx=True, px=self.lock_ttl_ms)):
+                return
+
+            try:
+                self.refreshes += 1
+                user = await refresh()
+                if user is None:
+                    await self.invalidate(email)
+                else:
+                    await self.set(user)
+            finally:
+                await self._redis("unlock", lambda: self._release_lock(keys=[lock_key], args=[token]))
+        finally:
+            self._refreshing.discard(email)
+
+    async def set(self, user: UserBaseModel | CachedUser) -> CachedUser:
+        """Write a user to both tiers and evict stale copies on other workers
+
+        The Redis write and the invalidation broadcast run in the background;
+        the caller only waits for the local tier.
+        """
+        if isinstance(user, UserBaseModel):
+            user = CachedUser.from_model(user)
+
+        payload = encode_user(user, time.time() + self._jittered(self.soft_ttl))
+        self.local.set(user.email, user)
+        spawn(self._store(user.email, payload), name=f"user-store:{user.email}")
+        return user
+
+    async def _store(self, email: str, payload: bytes) -> None:
+        stored = await self._redis(
+            "write",
+            lambda: get_redis_binary().set(self._key(email), payload, ex=int(self._jittered(self.hard_ttl))),
+        )
+        if stored:
+            await self._publish(email)
+
+    async def invalidate(self, email: str) -> None:
+        """Drop a user from both tiers on every worker"""
+        self.local.delete(email)
+        await self._redis("delete", lambda: get_redis_binary().delete(self._key(email)))
+        await self._publish(email)
+
+    async def invalidate_many(self, emails: list[str]) -> None:
+        """Drop many users in one pipeline, for bulk writes outside the request path"""
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for email in emails:
+                self.local.delete(email)
+                pipe.delete(self._key(email))
+                pipe.publish(USER_INVALIDATION_CHANNEL, json.dumps({"email": email, "origin": self.origin}))
+            await pipe.execute()
+
+    async def _publish(self, email: str) -> None:
+        await self._redis(
+            "publish",
+            lambda: get_redis().publish(
+                USER_INVALIDATION_CHANNEL,
+                json.dumps({"email": email, "origin": self.origin})
+            ),
+        )
+
+    def _on_invalidate(self, data: str) -> None:
+        message = json.loads(data)
+        if message.get("origin") != self.origin:
+            self.local.delete(message["email"])
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self.local.stats(),
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "refreshes": self.refreshes,
+            "negative_stored": self.negative_stored,
+        }
+
+
+_settings = get_settings().auth
+
+user_cache = UserCache(
+    local=LocalTTLCache(
+        maxsize=_settings.user_cache_local_size,
+        ttl=_settings.user_cache_local_ttl,
+    ),
+    soft_ttl=_settings.user_cache_soft_ttl,
+    hard_ttl=_settings.user_cache_ttl,
+    jitter=_settings.user_cache_ttl_jitter,
+    lock_ttl_ms=_settings.user_cache_lock_ttl_ms,
+    negative_ttl=_settings.user_cache_negative_ttl,
+)
+subscriber.subscribe(USER_INVALIDATION_CHANNEL, user_cache._on_invalidate)
@@ -0,0 +1,113 @@
+import time
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Annotated, Any, Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt
+
+from .cache import CachedUser
+from .repository import AuthRepository
+from .tokens import refresh_token_store
+from ..database import DatabaseSession, LocalTTLCache
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+security = HTTPBearer(scheme_name="Authorization", auto_error=False)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Identity carried by a verified access token"""
+
+    email: str
+    expires_at: float
+    claims: dict[str, Any]
+
+
+class TokenVerifier:
+    """Verifies access tokens, caching recently seen ones by digest"""
+
+    def __init__(self, cache: LocalTTLCache) -> None:
+        self.cache = cache
+
+    def verify(self, token: str) -> Principal:
+        """Return the principal for a valid access token or raise 401"""
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+
+        principal = self.cache.get(digest)
+        if principal is not None and principal.expires_at > now:
+            return principal
+
+        try:
+            payload = jwt.decode(token, get_settings().auth.secret_key, algorithms=["HS256"])
+        except jwt.JWTError:
+            raise _unauthorized("Invalid access token")
+
+        email = payload.get("email")
+        if email is None or payload.get("type") != "access":
+            raise _unauthorized("Invalid access token")
+
+        principal = Principal(email=email, expires_at=float(payload["exp"]), claims=payload)
+        self.cache.set(digest, principal, ttl=min(self.cache.ttl, principal.expires_at - now))
+        return principal
+
+
+token_verifier = TokenVerifier(
+    LocalTTLCache(
+        maxsize=get_settings().auth.token_cache_size,
+        ttl=get_settings().auth.token_cache_ttl,
+    )
+)
+
+
+async def get_current_principal(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+) -> Principal:
+    """Authenticate from the Authorization header or cookie without touching the database
+
+    Revocation goes through the in-process filter, so a session that was
+    never revoked costs no Redis round trip either.
+    """
+    token = credentials.credentials if credentials else request.cookies.get("Authorization")
+
+    if not token:
+        raise _unauthorized("Missing access token")
+
+    principal = token_verifier.verify(token)
+
+    if await refresh_token_store.is_revoked(principal.claims.get("fid")):
+        raise _unauthorized("Session revoked")
+
+    return principal
+
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+
+
+async def get_current_user(principal: CurrentPrincipal, database: DatabaseSession) -> CachedUser:
+    """Load the full user behind the principal through the cached repository path"""
+    user = await AuthRepository(database).get(principal.email)
+
+    if user is None:
+        raise _unauthorized("User not found")
+    if user.is_banned:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User is banned")
+
+    return user
+
+
+CurrentUser = Annotated[CachedUser, Depends(get_current_user)]
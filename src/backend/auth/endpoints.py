@@ -3,25 +3,30 @@ import logging
 from fastapi import APIRouter, Response, Request, HTTPException, status
 
 from .service import AuthService
+from .dependencies import CurrentUser
 from .schemas import UserBaseSchema, UserRegisterSchema, UserLoginSchema, UserTokensSchema, UserPasswordResetSchema
 from ..database import DatabaseSession
+from ..ratelimit import rate_limiter
 
 logger = logging.getLogger(__name__)
 auth_router = APIRouter(tags=["auth"])
 
 
 @auth_router.post("/register", response_model=UserBaseSchema)
-async def register(user: UserRegisterSchema, database: DatabaseSession):
+async def register(request: Request, user: UserRegisterSchema, database: DatabaseSession):
+    await rate_limiter.hit("register", request, email=user.email)
     auth_service = AuthService(database)
     return await auth_service.register(user)
 
 
 @auth_router.post("/login", response_model=UserTokensSchema)
 async def login(
+    request: Request,
     response: Response,
     credentials: UserLoginSchema,
     database: DatabaseSession
 ):
+    await rate_limiter.hit("login", request, email=credentials.email)
     auth_service = AuthService(database)
     result = await auth_service.login(credentials)
     response.set_cookie(
@@ -41,8 +46,12 @@ async def login(
 
 
 @auth_router.post("/logout")
-async def logout(response: Response) -> dict[str, str]:
-    """Logout user by removing the Authorization cookie"""
+async def logout(request: Request, response: Response, database: DatabaseSession) -> dict[str, str]:
+    """Logout user by revoking the session and removing the cookies"""
+    refresh_token = request.cookies.get("refresh_token")
+    if refresh_token:
+        await AuthService(database).logout(refresh_token)
+
     response.delete_cookie(key="Authorization")
     response.delete_cookie(key="refresh_token")
     return {"message": "Logged out successfully"}
@@ -79,8 +88,15 @@ async def refresh(request: Request, response: Response, database: DatabaseSessio
 
 
 @auth_router.post("/reset-password")
-async def reset_password(credentials: UserPasswordResetSchema, database: DatabaseSession):
+async def reset_password(request: Request, credentials: UserPasswordResetSchema, database: DatabaseSession):
     """Reset user password"""
+    await rate_limiter.hit("reset_password", request, email=credentials.email)
 
     auth_service = AuthService(database)
     return await auth_service.reset_password(credentials.email)
+
+
+@auth_router.get("/me", response_model=UserBaseSchema)
+async def me(user: CurrentUser):
+    """Return the authenticated user"""
+    return user
@@ -14,3 +14,9 @@ class EmailNotValidException(Exception):
     """Exception raised when an email is not valid."""
 
     ...
+
+
+class PasswordHashingUnavailableException(Exception):
+    """Exception raised when the password hashing pool is saturated or too slow."""
+
+    ...
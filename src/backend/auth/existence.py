@@ -0,0 +1,319 @@
+import json
+import time
+import uuid
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Optional
+
+from sqlalchemy import select, text
+
+from .models import UserBaseModel
+from ..database import (
+    BloomFilter,
+    RedisScript,
+    SessionLocal,
+    get_redis,
+    get_redis_binary,
+    redis_breaker,
+    subscriber,
+)
+from ..metrics import USER_CACHE_LOOKUPS
+from ..settings import get_settings
+from ..tasks import spawn
+
+logger = logging.getLogger(__name__)
+
+FILTER_KEY = "user:emails:filter"
+FILTER_META_KEY = "user:emails:filter:meta"
+FILTER_LOCK_KEY = "user:emails:filter:lock"
+EMAIL_ADDED_CHANNEL = "user:emails:added"
+
+# Registrations are replayed into every new filter for this long: the email
+# is added before its row commits, so a scan can start in between
+RECENT_WINDOW = 60.0
+SHARE_RETRY_MAX_DELAY = 30.0
+
+ESTIMATE_USERS = text("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE relname = 'users_base'")
+SELECT_EMAILS = select(UserBaseModel.email).execution_options(yield_per=10_000)
+
+# Sets an email's bits only if the bitmap was built with the same capacity
+# (and so the same bit positions) as the caller's filter
+_ADD_SCRIPT = """
+if redis.call('HGET', KEYS[2], 'capacity') ~= ARGV[1] then
+    return 0
+end
+for i = 2, #ARGV do
+    redis.call('SETBIT', KEYS[1], ARGV[i], 1)
+end
+redis.call('HINCRBY', KEYS[2], 'count', 1)
+return 1
+"""
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_FILTERED = USER_CACHE_LOOKUPS.labels("filtered")
+
+
+class EmailExistenceFilter:
+    """Bloom filter of registered emails, shared by every worker through Redis
+
+    A negative answer is definite, so lookups for unknown emails (nearly all
+    credential-stuffing traffic) stop before the cache and the database. One
+    worker builds the filter from users_base and stores it as a Redis bitmap;
+    the others load that bitmap. New registrations set their bits in the
+    bitmap and are broadcast to every worker. Deleted users stay in the
+    filter until the next periodic rebuild, which only costs a database
+    lookup. Until the filter is loaded every email is reported as possibly
+    registered.
+
+    A false negative locks a real user out, so whenever a registration may
+    have been missed (the pub/sub connection dropped, or the shared filter
+    was reset) the filter is dropped and every email passes until it has
+    been reloaded.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, rebuild_interval: float, lock_ttl: float = 120.0) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.lock_ttl = lock_ttl
+        self.origin = uuid.uuid4().hex
+
+        self._filter: Optional[BloomFilter] = None
+        self._recent: deque[tuple[float, str]] = deque(maxlen=100_000)
+        self._refreshing = False
+        self._stale = False
+        self._task: Optional[asyncio.Task] = None
+        self._add = RedisScript(_ADD_SCRIPT)
+        self._release_lock = RedisScript(_RELEASE_LOCK_SCRIPT)
+        self.filtered = 0
+        self.passed = 0
+        self.builds = 0
+        self.loads = 0
+        self.distrusted = 0
+        self.share_retries = 0
+
+    def might_exist(self, email: str) -> bool:
+        if self._filter is None or email in self._filter:
+            self.passed += 1
+            return True
+
+        self.filtered += 1
+        _FILTERED.inc()
+        return False
+
+    def _add_local(self, email: str) -> None:
+        if self._filter is not None:
+            self._filter.add(email)
+
+        now = time.monotonic()
+        self._recent.append((now, email))
+        while self._recent and self._recent[0][0] < now - RECENT_WINDOW:
+            self._recent.popleft()
+
+    def _replay_recent(self, bloom: BloomFilter) -> None:
+        cutoff = time.monotonic() - RECENT_WINDOW
+        for added_at, email in self._recent:
+            if added_at >= cutoff:
+                bloom.add(email)
+
+    def _schedule_refresh(self) -> None:
+        if not self._refreshing:
+            spawn(self.refresh(), name="email-filter-refresh")
+
+    def distrust(self, reason: str) -> None:
+        """Pass every email through until the filter has been reloaded"""
+        logger.warning(f"Email filter may be missing registrations ({reason}), passing lookups through until reloaded")
+        self.distrusted += 1
+        self._filter = None
+        self._stale = True
+        self._schedule_refresh()
+
+    async def _share(self, email: str, bloom: Optional[BloomFilter]) -> None:
+        if bloom is not None:
+            offsets = [BloomFilter.bit_offset(position) for position in bloom.positions(email)]
+            if not await self._add(keys=[FILTER_KEY, FILTER_META_KEY], args=[bloom.capacity, *offsets]):
+                logger.info("Shared email filter was rebuilt with a new size, reloading")
+                self._schedule_refresh()
+        await get_redis().publish(EMAIL_ADDED_CHANNEL, json.dumps({"email": email, "origin": self.origin}))
+
+    async def _share_until_done(self, email: str) -> None:
+        """Keep retrying a failed share; other workers reject the email until it lands"""
+        delay = 0.5
+        while True:
+            await asyncio.sleep(delay)
+            self.share_retries += 1
+            try:
+                await redis_breaker.call(lambda: self._share(email, self._filter), timeout=1.0)
+                return
+            except Exception as exc:
+                logger.warning(f"Email filter update for {email} still not shared: {exc!r}")
+                delay = min(delay * 2, SHARE_RETRY_MAX_DELAY)
+
+    async def add(self, email: str) -> None:
+        """Record a registration on every worker and in the shared bitmap"""
+        self._add_local(email)
+        bloom = self._filter
+
+        try:
+            await redis_breaker.call(lambda: self._share(email, bloom))
+        except Exception as exc:
+            logger.warning(f"Email filter update for {email} not shared, retrying in the background: {exc!r}")
+            spawn(self._share_until_done(email), name=f"email-filter-share:{email}")
+
+    async def reset_shared(self) -> None:
+        """Drop the shared filter and make every worker rebuild, e.g. after a bulk import"""
+        await get_redis().delete(FILTER_META_KEY)
+        await get_redis().publish(EMAIL_ADDED_CHANNEL, json.dumps({"reset": True, "origin": self.origin}))
+
+    def _on_added(self, data: str) -> None:
+        message = json.loads(data)
+        if message.get("reset"):
+            self.distrust("shared filter reset")
+        elif message.get("origin") != self.origin:
+            self._add_local(message["email"])
+
+    def _on_reconnect(self) -> None:
+        self.distrust("pub/sub reconnected")
+
+    async def _build(self) -> BloomFilter:
+        """Scan users_base on the primary into a new filter sized for the current table"""
+        async with SessionLocal() as session:
+            estimate = (await session.execute(ESTIMATE_USERS)).scalar() or 0
+            bloom = BloomFilter(max(self.capacity, int(estimate * 1.25)), self.error_rate)
+
+            result = await session.stream(SELECT_EMAILS)
+            async for email in result.scalars():
+                bloom.add(email)
+
+        self.builds += 1
+        return bloom
+
+    async def _load_shared(self) -> Optional[BloomFilter]:
+        meta = await get_redis().hgetall(FILTER_META_KEY)
+        if not meta or float(meta.get("built_at", 0)) < time.time() - self.rebuild_interval:
+            return None
+
+        bitmap = await get_redis_binary().get(FILTER_KEY)
+        if not bitmap:
+            return None
+
+        try:
+            bloom = BloomFilter.from_redis(int(meta["capacity"]), float(meta["error_rate"]), bitmap, int(meta["count"]))
+        except (KeyError, ValueError) as exc:
+            logger.warning(f"Discarding unreadable shared email filter: {exc}")
+            return None
+
+        self.loads += 1
+        return bloom
+
+    async def _store_shared(self, bloom: BloomFilter) -> None:
+        async with get_redis_binary().pipeline(transaction=True) as pipe:
+            pipe.set(FILTER_KEY, bloom.to_redis())
+            pipe.delete(FILTER_META_KEY)
+            pipe.hset(FILTER_META_KEY, mapping={
+                "capacity": bloom.capacity,
+                "error_rate": bloom.error_rate,
+                "count": bloom.count,
+                "built_at": time.time(),
+            })
+            await pipe.execute()
+
+    async def _obtain(self) -> BloomFilter:
+        """Load the shared filter, building it when missing or older than the rebuild interval"""
+        deadline = time.monotonic() + self.lock_ttl
+
+        while True:
+            bloom = await self._load_shared()
+            if bloom is not None:
+                return bloom
+
+            token = uuid.uuid4().hex
+            if await get_redis().set(FILTER_LOCK_KEY, token, nx=True, px=int(self.lock_ttl * 1000)):
+                try:
+                    bloom = await self._build()
+                    # Registrations seen around the scan may not have committed in time for it
+                    self._replay_recent(bloom)
+                    await self._store_shared(bloom)
+                    return bloom
+                finally:
+                    await self._release_lock(keys=[FILTER_LOCK_KEY], args=[token])
+
+            if time.monotonic() > deadline:
+                logger.warning("Timed out waiting for another worker to build the email filter, building locally")
+                return await self._build()
+            await asyncio.sleep(1)
+
+    async def refresh(self) -> None:
+        """Swap in the current shared filter, replaying recent registrations"""
+        if self._refreshing:
+            return
+
+        self._refreshing = True
+        try:
+            # Start over if the filter was distrusted while this one was loading
+            while True:
+                self._stale = False
+                try:
+                    bloom = await self._obtain()
+                except Exception:
+                    logger.exception("Shared email filter unavailable, building locally")
+                    bloom = await self._build()
+
+                self._replay_recent(bloom)
+                if not self._stale:
+                    self._filter = bloom
+                    break
+        finally:
+            self._refreshing = False
+
+        logger.info(f"Email filter ready with {bloom.count} emails ({len(bloom.bits) / 1024:.0f} KiB).")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("Failed to load email filter, lookups will go to the cache and database")
+            await asyncio.sleep(self.rebuild_interval)
+
+    async def start(self) -> None:
+        """Load the filter in the background; lookups pass through until it is ready"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="email-filter")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self._filter is not None,
+            "entries": self._filter.count if self._filter else 0,
+            "bytes": len(self._filter.bits) if self._filter else 0,
+            "filtered": self.filtered,
+            "passed": self.passed,
+            "builds": self.builds,
+            "loads": self.loads,
+            "distrusted": self.distrusted,
+            "share_retries": self.share_retries,
+        }
+
+
+_settings = get_settings().auth
+
+email_filter = EmailExistenceFilter(
+    capacity=_settings.email_filter_capacity,
+    error_rate=_settings.email_filter_error_rate,
+    rebuild_interval=_settings.email_filter_rebuild_interval,
+)
+subscriber.subscribe(EMAIL_ADDED_CHANNEL, email_filter._on_added)
+subscriber.on_reconnect(email_filter._on_reconnect)
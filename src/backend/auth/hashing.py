@@ -0,0 +1,238 @@
+import os
+import math
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+import bcrypt
+from passlib.context import CryptContext
+
+from .exceptions import PasswordHashingUnavailableException
+from ..metrics import PASSWORD_HASH_DURATION, PASSWORD_POOL_PENDING
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+bcrypt.__about__ = bcrypt  # Fix a AttributeError in passlib type: ignore
+
+
+def hash_password_sync(password: str) -> str:
+    """ Hash a password, executed inside a pool worker """
+    return pwd_context.hash(password)
+
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    """ Verify a password, executed inside a pool worker """
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def configure_rounds(rounds: int, max_rounds: int) -> None:
+    """ Hash with `rounds` and flag hashes outside [rounds, max_rounds] as needing an update
+
+    Also used as the pool worker initializer, so every process shares the policy.
+    Hashes above the calibrated cost are kept up to max_rounds, which stops
+    users being rehashed back and forth between faster and slower hosts.
+    """
+    pwd_context.update(
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=max(rounds, max_rounds),
+    )
+
+
+def calibrate_rounds(target: float, min_rounds: int, max_rounds: int, samples: int = 3) -> int:
+    """ Highest bcrypt cost whose verify time on this host stays within target seconds """
+    probe = pwd_context.handler("bcrypt").using(rounds=min_rounds)
+    hashed = probe.hash("calibration")
+
+    elapsed = math.inf
+    for _ in range(samples):
+        started = time.perf_counter()
+        probe.verify("calibration", hashed)
+        elapsed = min(elapsed, time.perf_counter() - started)
+
+    # Each extra round doubles the work
+    rounds = min_rounds + math.floor(math.log2(target / elapsed)) if elapsed < target else min_rounds
+    return max(min_rounds, min(max_rounds, rounds))
+
+
+class PasswordHashingPool:
+    """ Bounded process pool that keeps bcrypt work off the event loop """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_queue: int,
+        timeout: float,
+        latency_window: int = 1024,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+
+        self.rounds: Optional[int] = None
+        self.max_rounds: Optional[int] = None
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._completed = 0
+        self._latencies: deque[float] = deque(maxlen=latency_window)
+
+    async def calibrate(
+        self,
+        target: float,
+        min_rounds: int,
+        max_rounds: int,
+        rounds: Optional[int] = None,
+    ) -> int:
+        """ Pick the bcrypt cost for this host, must run before start() """
+        if rounds is None:
+            rounds = await asyncio.to_thread(calibrate_rounds, target, min_rounds, max_rounds)
+            logger.info(f"Password hashing calibrated to {rounds} bcrypt rounds for a {target * 1000:.0f} ms target.")
+        else:
+            logger.info(f"Password hashing pinned to {rounds} bcrypt rounds.")
+
+        self.rounds, self.max_rounds = rounds, max(rounds, max_rounds)
+        configure_rounds(self.rounds, self.max_rounds)
+        return rounds
+
+    def start(self) -> None:
+        """ Spawn the worker processes
+
+        Workers come from a forkserver: by now the app has threads (asyncio's
+        default executor, Redis and database drivers), and forking the app
+        itself could copy a lock held by one of them into the child.
+        """
+        if self._executor is not None:
+            return
+
+        initializer = {} if self.rounds is None else {
+            "initializer": configure_rounds,
+            "initargs": (self.rounds, self.max_rounds),
+        }
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+            **initializer,
+        )
+
+        # Processes are spawned on demand; one job per worker starts them all
+        # now instead of on the first logins
+        for _ in range(self.max_workers):
+            self._executor.submit(os.getpid)
+        logger.info(f"Password hashing pool started with {self.max_workers} workers.")
+
+    async def warm(self) -> None:
+        """ Run a cheap verify on every worker so each one has loaded the bcrypt backend
+
+        Goes around _submit so warm-up jobs stay out of the latency numbers.
+        """
+        if self._executor is None:
+            self.start()
+
+        hashed = pwd_context.handler("bcrypt").using(rounds=4).hash("warmup")
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._executor, verify_password_sync, "warmup", hashed)
+            for _ in range(self.max_workers)
+        ))
+
+    @property
+    def saturated(self) -> bool:
+        """ True when jobs are already waiting for a worker """
+        return self._pending >= self.max_workers
+
+    async def shutdown(self) -> None:
+        """ Stop the worker processes, waiting for in-flight jobs """
+        if self._executor is None:
+            return
+
+        executor, self._executor = self._executor, None
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+        logger.info("Password hashing pool stopped.")
+
+    async def _submit(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        """ Run a job in the pool, enforcing the queue bound and the timeout """
+        if self._pending >= self.max_workers + self.max_queue:
+            self._rejected += 1
+            logger.warning(f"Password hashing queue is full ({self._pending} pending).")
+            raise PasswordHashingUnavailableException()
+
+        if self._executor is None:
+            self.start()
+
+        self._pending += 1
+        PASSWORD_POOL_PENDING.inc()
+        started = time.perf_counter()
+
+        # A process job cannot be cancelled, so its slot is only freed when
+        # it really finishes, not when the caller stops waiting for it
+        loop = asyncio.get_running_loop()
+        job = loop.run_in_executor(self._executor, func, *args)
+        job.add_done_callback(self._release)
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(job), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            logger.warning(f"Password hashing job timed out after {self.timeout}s.")
+            raise PasswordHashingUnavailableException()
+
+        elapsed = time.perf_counter() - started
+        self._completed += 1
+        self._latencies.append(elapsed)
+        PASSWORD_HASH_DURATION.labels(operation).observe(elapsed)
+        return result
+
+    def _release(self, job: asyncio.Future) -> None:
+        self._pending -= 1
+        PASSWORD_POOL_PENDING.dec()
+        if not job.cancelled():
+            job.exception()  # retrieved here when nobody awaits it any more
+
+    async def hash(self, password: str) -> str:
+        """ Hash a password in the pool """
+        return await self._submit("hash", hash_password_sync, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """ Verify a password against its hash in the pool """
+        return await self._submit("verify", verify_password_sync, plain_password, hashed_password)
+
+    def stats(self) -> dict[str, Any]:
+        """ Queue depth and latency numbers used to size the pool """
+        latencies = sorted(self._latencies)
+
+        def percentile(value: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(len(latencies) * value))]
+
+        return {
+            "workers": self.max_workers,
+            "rounds": self.rounds,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "queued": max(0, self._pending - self.max_workers),
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "timeouts": self._timeouts,
+            "latency_p50_seconds": percentile(0.50),
+            "latency_p99_seconds": percentile(0.99),
+            "latency_max_seconds": latencies[-1] if latencies else None,
+        }
+
+
+_settings = get_settings().auth
+
+password_pool = PasswordHashingPool(
+    max_workers=_settings.password_pool_size,
+    max_queue=_settings.password_pool_queue_size,
+    timeout=_settings.password_hash_timeout,
+)
@@ -0,0 +1,135 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from sqlalchemy import text
+
+from ..database import SessionLocal
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+BULK_UPDATE_LAST_LOGIN = text("""
+    UPDATE users_base AS u
+    SET last_login = v.last_login
+    FROM unnest(CAST(:emails AS text[]), CAST(:logins AS timestamptz[])) AS v(email, last_login)
+    WHERE lower(u.email) = v.email
+      AND (u.last_login IS NULL OR u.last_login < v.last_login)
+""")
+
+
+class LastLoginBuffer:
+    """Buffers login timestamps in memory and writes them in bulk
+
+    Cached users keep the last_login they were cached with; nothing on the
+    request path reads it, so the cache is not rewritten on every flush.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_staleness: float) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_staleness = max_staleness
+
+        self._pending: dict[str, datetime] = {}
+        self._oldest: Optional[float] = None
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+        self.flushed = 0
+        self.failures = 0
+
+    def touch(self, email: str, at: Optional[datetime] = None) -> None:
+        """Record a login; the row is written on the next flush"""
+        self._pending[email] = at or datetime.now(timezone.utc)
+
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _next_timeout(self) -> float:
+        """Sleep until the flush interval or the staleness bound, whichever is first"""
+        if self._oldest is None:
+            return self.flush_interval
+
+        age = time.monotonic() - self._oldest
+        return max(0.0, min(self.flush_interval, self.max_staleness - age))
+
+    async def flush(self) -> None:
+        """Write every pending timestamp, one UPDATE per batch"""
+        if not self._pending:
+            return
+
+        pending, self._pending, self._oldest = self._pending, {}, None
+        items = list(pending.items())
+
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            try:
+                async with SessionLocal() as session:
+                    await session.execute(
+                        BULK_UPDATE_LAST_LOGIN,
+                        {
+                            "emails": [email for email, _ in batch],
+                            "logins": [login for _, login in batch],
+                        },
+                    )
+                    await session.commit()
+                self.flushed += len(batch)
+            except Exception:
+                self.failures += 1
+                logger.exception(f"Failed to flush {len(batch)} last_login updates, will retry")
+                for email, login in batch:
+                    newer = self._pending.get(email)
+                    if newer is None or newer < login:
+                        self._pending[email] = login
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_timeout())
+            except asyncio.TimeoutError:
+                pass
+
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flush loop and write whatever is still buffered
+
+        The loop is woken rather than cancelled: cancelling it mid-flush would
+        drop the batch it had already taken out of the buffer.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        await self.flush()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "failures": self.failures,
+        }
+
+
+_settings = get_settings().auth
+
+last_login_buffer = LastLoginBuffer(
+    batch_size=_settings.last_login_batch_size,
+    flush_interval=_settings.last_login_flush_interval,
+    max_staleness=_settings.last_login_max_staleness,
+)
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import String, Integer, DateTime, func
+from sqlalchemy import String, Integer, DateTime, Index, func, text
 from sqlalchemy.orm import mapped_column, Mapped
 
 from ..database import CustomBase
@@ -9,9 +9,21 @@ from .enums import UserPermissionRole, UserVerificationStatus
 
 class UserBaseModel(CustomBase):
     __tablename__ = "users_base"
+    __table_args__ = (
+        # Emails are unique case-insensitively; lookups go through this index too
+        Index("ix_users_base_email_lower", text("lower(email)"), unique=True),
+        Index("ix_users_base_created_at_id", "created_at", "id"),
+        Index("ix_users_base_last_login", "last_login"),
+        Index(
+            "ix_users_base_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True, autoincrement=True)
-    email: Mapped[str] = mapped_column(String, unique=True, index=True)
+    email: Mapped[str] = mapped_column(String)
     hash_password: Mapped[str] = mapped_column(String)
     is_banned: Mapped[bool] = mapped_column(default=False)
     permissions: Mapped[UserPermissionRole] = mapped_column(
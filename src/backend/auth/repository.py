@@ -1,142 +1,184 @@
 import datetime
-import json
 import logging
 from typing import Optional, Any
 
+from sqlalchemy import delete, update, bindparam, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.future import select
 
+from .cache import user_cache, CachedUser
+from .existence import email_filter
+from .last_login import last_login_buffer
 from .schemas import UserRegisterSchema
 from .models import UserBaseModel
 from .exceptions import UserAlreadyExistsException, UserNotFoundException
 from .enums import UserPermissionRole, UserVerificationStatus
-from ..database import DatabaseSession, redis
+from ..database import DatabaseSession, ReadSessionLocal, replica_router
 from ..exceptions import ServerErrorException
+from ..fields import normalize_email
 
 logger = logging.getLogger(__name__)
 
+EMAIL_KEY = func.lower(UserBaseModel.email)
+
+SELECT_USER_BY_EMAIL = select(UserBaseModel).where(EMAIL_KEY == bindparam("email"))
+
+
+def _update_statement(email: str, values: dict[str, Any], *conditions):
+    return (
+        update(UserBaseModel)
+        .where(EMAIL_KEY == email, *conditions)
+        .values(**values)
+        .returning(UserBaseModel)
+    )
+
+
+# Prepared on every pooled connection at startup; nothing matches the empty
+# email and the warm-up rolls back
+WARMUP_STATEMENTS = [
+    (SELECT_USER_BY_EMAIL, {"email": ""}),
+    (_update_statement("", {"verification_status": UserVerificationStatus.CONFIRMED.value}), {}),
+    (_update_statement("", {"hash_password": ""}), {}),
+    (_update_statement("", {"hash_password": ""}, UserBaseModel.hash_password == ""), {}),
+]
+
 
 class AuthRepository:
     def __init__(self, database: DatabaseSession) -> None:
         self.database = database
 
     @staticmethod
-    def _default_serializer(obj):
-        """Serialize datetime objects to ISO format"""
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        raise TypeError(f"Type {type(obj)} not serializable")
+    async def _select_user(session, email: str) -> Optional[UserBaseModel]:
+        result = await session.execute(SELECT_USER_BY_EMAIL, {"email": email})
+        return result.scalars().first()
 
     @staticmethod
-    def _datetime_decoder(dct: dict) -> dict:
-        """Deserialize ISO format datetime strings to datetime objects"""
-        for key in ['created_at', 'last_login']:
-            if key in dct and isinstance(dct[key], str):
-                try:
-                    dct[key] = datetime.datetime.fromisoformat(dct[key])
-                except ValueError:
-                    pass
-        return dct
-
-    async def get(self, email: str) -> Optional[UserBaseModel]:
+    async def _refresh_user(email: str) -> Optional[UserBaseModel]:
+        """Load a user in its own session, used for background cache refreshes"""
+        async with ReadSessionLocal(email) as session:
+            return await AuthRepository._select_user(session, email)
+
+    async def _load_user(self, email: str) -> Optional[UserBaseModel]:
+        """Cache-miss load, served by a replica unless this email was just written"""
+        async with ReadSessionLocal(email) as session:
+            user = await self._select_user(session, email)
+
+        if user:
+            logger.debug(f"User loaded from DB: {email}")
+        return user
+
+    async def get(self, email: str) -> Optional[CachedUser]:
         """Retrieve a user by email with Redis caching"""
         logger.info(f"Fetching user by email: {email}")
+        email = normalize_email(email)
 
-        try:
-            cached_data = await redis.get(f"user:{email}")
-            if cached_data:
-                logger.debug(f"User found in cache: {email}")
-                data = json.loads(cached_data, object_hook=self._datetime_decoder)
-                return UserBaseModel(**data)
-
-            async with self.database as session:
-                stmt = select(UserBaseModel).where(UserBaseModel.email == email)
-                result = await session.execute(stmt)
-                user = result.scalars().first()
-
-                if user:
-                    await redis.set(
-                        f"user:{email}",
-                        json.dumps(user.model_dump(), default=self._default_serializer),
-                        ex=300
-                    )
-                    logger.debug(f"User loaded from DB and cached: {email}")
-
-                return user
+        if not email_filter.might_exist(email):
+            return None
 
+        try:
+            return await user_cache.get_or_load(
+                email,
+                load=lambda: self._load_user(email),
+                refresh=lambda: self._refresh_user(email),
+            )
         except Exception as exc:
             logger.exception(f"Failed to retrieve user {email}: {exc}")
             raise ServerErrorException()
 
     async def create(self, user_data: UserRegisterSchema) -> UserBaseModel:
-        """Create a new user"""
-        logger.info(f"Creating user: {user_data.email}")
-
-        if await self.get(user_data.email):
-            logger.warning(f"User already exists: {user_data.email}")
-            raise UserAlreadyExistsException(f"User with email {user_data.email} already exists")
-
-        user = UserBaseModel(
-            email=user_data.email,
-            hash_password=user_data.password,
-            is_banned=False,
-            permissions=UserPermissionRole.USER.value,
-            verification_status=UserVerificationStatus.NOT_CONFIRMED.value,
-            last_login=datetime.datetime.now(datetime.timezone.utc),
+        """Create a new user in a single INSERT, relying on the unique email index for duplicates"""
+        email = normalize_email(user_data.email)
+        logger.info(f"Creating user: {email}")
+
+        statement = (
+            insert(UserBaseModel)
+            .values(
+                email=email,
+                hash_password=user_data.password,
+                is_banned=False,
+                permissions=UserPermissionRole.USER.value,
+                verification_status=UserVerificationStatus.NOT_CONFIRMED.value,
+                last_login=datetime.datetime.now(datetime.timezone.utc),
+            )
+            .on_conflict_do_nothing(index_elements=[EMAIL_KEY])
+            .returning(UserBaseModel)
         )
 
+        # Before the insert: a false positive is harmless, a missing email is not
+        await email_filter.add(email)
+
         try:
             async with self.database as session:
-                session.add(user)
+                user = (await session.execute(statement)).scalars().first()
                 await session.commit()
         except Exception as exc:
-            logger.exception(f"Failed to create user {user_data.email}: {exc}")
+            logger.exception(f"Failed to create user {email}: {exc}")
             raise ServerErrorException()
 
-        await redis.set(
-            f"user:{user.email}",
-            json.dumps(user.model_dump(), default=self._default_serializer),
-            ex=300
-        )
+        if user is None:
+            logger.warning(f"User already exists: {email}")
+            raise UserAlreadyExistsException(f"User with email {email} already exists")
+
+        await replica_router.mark_written(user.email)
+        await user_cache.set(user)
 
         logger.debug(f"User created and cached: {user.email}")
         return user
 
-    async def update(self, email: str, update_data: dict[str, Any]) -> UserBaseModel:
-        """Update user fields and refresh cache"""
-        logger.info(f"Updating user: {email}")
+    async def _update(self, email: str, values: dict[str, Any], *conditions) -> Optional[UserBaseModel]:
+        """One UPDATE ... RETURNING of the given columns, refreshing the cache from the returned row"""
+        email = normalize_email(email)
+        statement = _update_statement(email, values, *conditions)
 
-        user = await self.get(email)
-        if not user:
+        try:
+            async with self.database as session:
+                user = (await session.execute(statement)).scalars().first()
+                await session.commit()
+        except Exception as exc:
+            logger.exception(f"Failed to update user {email}: {exc}")
+            raise ServerErrorException()
+
+        if user:
+            await replica_router.mark_written(email)
+            await user_cache.set(user)
+        return user
+
+    async def _update_existing(self, email: str, values: dict[str, Any]) -> UserBaseModel:
+        user = await self._update(email, values)
+        if user is None:
             logger.warning(f"User not found: {email}")
+            await user_cache.invalidate(normalize_email(email))
             raise UserNotFoundException()
 
-        try:
-            for field, value in update_data.items():
-                if hasattr(user, field):
-                    setattr(user, field, value)
+        logger.debug(f"User updated and cache refreshed: {user.email}")
+        return user
 
-            user.last_login = datetime.datetime.now(datetime.timezone.utc)
+    async def set_email_verified(self, email: str) -> UserBaseModel:
+        """Mark a user's email as confirmed"""
+        logger.info(f"Confirming email of user: {email}")
+        return await self._update_existing(email, {"verification_status": UserVerificationStatus.CONFIRMED.value})
 
-            async with self.database as session:
-                session.add(user)
-                await session.commit()
-                await session.refresh(user)
+    async def set_password_hash(self, email: str, hash_password: str) -> UserBaseModel:
+        """Replace a user's password hash unconditionally"""
+        logger.info(f"Setting password of user: {email}")
+        return await self._update_existing(email, {"hash_password": hash_password})
 
-            await redis.set(
-                f"user:{user.email}",
-                json.dumps(user.model_dump(), default=self._default_serializer),
-                ex=300
-            )
+    async def set_banned(self, email: str, banned: bool) -> UserBaseModel:
+        """Ban or unban a user"""
+        logger.info(f"{'Banning' if banned else 'Unbanning'} user: {email}")
+        return await self._update_existing(email, {"is_banned": banned})
 
-            logger.debug(f"User updated and cache refreshed: {user.email}")
-            return user
+    async def replace_password_hash(self, email: str, current_hash: str, new_hash: str) -> Optional[UserBaseModel]:
+        """Swap the password hash only if it is still the one that was verified"""
+        return await self._update(email, {"hash_password": new_hash}, UserBaseModel.hash_password == current_hash)
 
-        except Exception as exc:
-            logger.exception(f"Failed to update user {email}: {exc}")
-            raise ServerErrorException()
+    async def update_last_login(self, email: str) -> None:
+        """Buffer a login timestamp; it is written by the next bulk flush"""
+        last_login_buffer.touch(email)
 
     async def delete(self, email: str) -> None:
         """Delete a user by email"""
+        email = normalize_email(email)
         logger.info(f"Deleting user: {email}")
 
         user = await self.get(email)
@@ -146,10 +188,11 @@ class AuthRepository:
 
         try:
             async with self.database as session:
-                await session.delete(user)
+                await session.execute(delete(UserBaseModel).where(UserBaseModel.id == user.id))
                 await session.commit()
 
-            await redis.delete(f"user:{email}")
+            await replica_router.mark_written(email)
+            await user_cache.invalidate(email)
             logger.debug(f"User deleted and removed from cache: {email}")
 
         except Exception as exc:
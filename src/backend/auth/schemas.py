@@ -2,6 +2,8 @@ from datetime import datetime
 
 from pydantic import BaseModel
 
+from ..fields import NormalizedEmail
+
 
 class UserBaseSchema(BaseModel):
     id: int
@@ -13,7 +15,7 @@ class UserBaseSchema(BaseModel):
 
 
 class UserRegisterSchema(BaseModel):
-    email: str
+    email: NormalizedEmail
     password: str
 
 
@@ -23,9 +25,9 @@ class UserTokensSchema(BaseModel):
 
 
 class UserLoginSchema(BaseModel):
-    email: str
+    email: NormalizedEmail
     password: str
 
 
 class UserPasswordResetSchema(BaseModel):
-    email: str
\ No newline at end of file
+    email: NormalizedEmail
\ No newline at end of file
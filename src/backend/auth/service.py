@@ -1,24 +1,21 @@
-import os
 import bcrypt
-from passlib.context import CryptContext
-from datetime import timedelta, datetime
+import logging
+from datetime import timedelta, datetime, timezone
 
-from dotenv import load_dotenv
-from fastapi.security import HTTPBearer
 from jose import jwt
 
 from .repository import AuthRepository
 from .schemas import UserRegisterSchema, UserBaseSchema, UserLoginSchema, UserTokensSchema
 from .exceptions import UserNotFoundException, EmailNotValidException
+from .hashing import password_pool, pwd_context
+from .tokens import refresh_token_store, RotationResult
 
-from ..database import DatabaseSession
+from ..database import DatabaseSession, SessionLocal
 from ..email import EmailService
+from ..settings import get_settings
+from ..tasks import spawn
 
-load_dotenv()
-
-security = HTTPBearer(scheme_name="Authorization")
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-bcrypt.__about__ = bcrypt  # Fix a AttributeError in passlib type: ignore
+logger = logging.getLogger(__name__)
 
 
 class AuthService:
@@ -31,22 +28,22 @@ class AuthService:
         return bcrypt.gensalt().decode('utf-8')
 
     @staticmethod
-    def _password_hasher(password: str) -> str:
-        """ Hash a password using bcrypt """
-        return pwd_context.hash(password)
+    async def _password_hasher(password: str) -> str:
+        """ Hash a password using bcrypt in the hashing pool """
+        return await password_pool.hash(password)
 
     @staticmethod
-    def _password_checker(plain_password: str, hashed_password: str) -> bool:
-        """ Check a password against its hash """
-        return pwd_context.verify(plain_password, hashed_password)
+    async def _password_checker(plain_password: str, hashed_password: str) -> bool:
+        """ Check a password against its hash in the hashing pool """
+        return await password_pool.verify(plain_password, hashed_password)
 
     @staticmethod
     def __encode_token(data: dict, expires_delta: timedelta) -> str:
         """ Encode a JWT token with an expiration time """
         payload = data.copy()
-        payload.update({"exp": datetime.now() + expires_delta})
+        payload.update({"exp": datetime.now(timezone.utc) + expires_delta})
 
-        return jwt.encode(payload, os.getenv("SECRET_KEY"), algorithm="HS256")
+        return jwt.encode(payload, get_settings().auth.secret_key, algorithm="HS256")
 
     @staticmethod
     def _email_validator(email: str) -> bool:
@@ -54,19 +51,25 @@ class AuthService:
         return isinstance(email, str) and "@" in email and "." in email
 
     @staticmethod
-    def _create_tokens(data: dict) -> UserTokensSchema:
+    def _create_tokens(data: dict, jti: str) -> UserTokensSchema:
         """Generate access and refresh tokens"""
-        access_token = AuthService.__encode_token(data, timedelta(minutes=40))
-        refresh_token = AuthService.__encode_token(data, timedelta(days=7))
+        access_token = AuthService.__encode_token({**data, "type": "access"}, timedelta(minutes=40))
+        refresh_token = AuthService.__encode_token({**data, "type": "refresh", "jti": jti}, timedelta(days=7))
 
         return UserTokensSchema(access_token=access_token, refresh_token=refresh_token)
 
+    @staticmethod
+    def warm_tokens() -> None:
+        """ Encode and decode a token pair once, loading the JWT code paths """
+        tokens = AuthService._create_tokens({"email": "warmup", "fid": "warmup"}, "warmup")
+        AuthService._decode_refresh_token(tokens.refresh_token)
+
     async def register(self, user: UserRegisterSchema) -> UserBaseSchema:
         """ Function to register a new user """
         if not self._email_validator(user.email):
             raise EmailNotValidException()
 
-        user.password = self._password_hasher(user.password)
+        user.password = await self._password_hasher(user.password)
         user_orm = await self.auth_repository.create(user)
 
         await EmailService().send_challenge(user.email, "register")
@@ -91,31 +94,73 @@ class AuthService:
 
         found_user = await self.auth_repository.get(email=credentials.email)
 
-        if not found_user or not self._password_checker(credentials.password, found_user.hash_password):
+        if not found_user or not await self._password_checker(credentials.password, found_user.hash_password):
             raise UserNotFoundException()
 
         await self.update_last_login(found_user.email)
 
-        tokens = self._create_tokens({"email": found_user.email})
+        if pwd_context.needs_update(found_user.hash_password) and not password_pool.saturated:
+            spawn(
+                self._rehash_password(found_user.email, credentials.password, found_user.hash_password),
+                name=f"rehash:{found_user.email}",
+            )
+
+        family_id, jti = await refresh_token_store.issue(found_user.email)
+        tokens = self._create_tokens({"email": found_user.email, "fid": family_id}, jti)
 
         return tokens
 
-    async def refresh_access_token(self, refresh_token: str) -> UserTokensSchema:
-        """ Refresh access token using a refresh token """
+    @staticmethod
+    async def _rehash_password(email: str, password: str, current_hash: str) -> None:
+        """ Upgrade an outdated hash after a successful login, in its own session """
+        new_hash = await password_pool.hash(password)
 
-        try:
-            payload = jwt.decode(refresh_token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
-            email: str = payload.get("email")
+        async with SessionLocal() as session:
+            user = await AuthRepository(session).replace_password_hash(email, current_hash, new_hash)
+
+        if user:
+            logger.info(f"Password hash upgraded for {email}.")
 
-            if email is None:
-                raise UserNotFoundException()
+    @staticmethod
+    def _decode_refresh_token(refresh_token: str) -> dict:
+        """ Decode a refresh token, rejecting anything that is not one """
+        try:
+            payload = jwt.decode(refresh_token, get_settings().auth.secret_key, algorithms=["HS256"])
         except jwt.JWTError:
             raise UserNotFoundException()
 
-        tokens = self._create_tokens({"email": email})
+        if (
+            payload.get("email") is None
+            or payload.get("type") != "refresh"
+            or payload.get("fid") is None
+            or payload.get("jti") is None
+        ):
+            raise UserNotFoundException()
+
+        return payload
+
+    async def refresh_access_token(self, refresh_token: str) -> UserTokensSchema:
+        """ Rotate the refresh token and issue a new token pair """
+        payload = self._decode_refresh_token(refresh_token)
+        email, family_id = payload["email"], payload["fid"]
+
+        result, jti = await refresh_token_store.rotate(family_id, payload["jti"])
+        if result is not RotationResult.ROTATED:
+            raise UserNotFoundException()
+
+        tokens = self._create_tokens({"email": email, "fid": family_id}, jti)
 
         return tokens
 
+    async def logout(self, refresh_token: str) -> None:
+        """ Revoke the session behind a refresh token """
+        try:
+            payload = self._decode_refresh_token(refresh_token)
+        except UserNotFoundException:
+            return
+
+        await refresh_token_store.revoke(payload["fid"])
+
     async def reset_password(self, email: str) -> None:
         """ Reset user password """
         if not self._email_validator(email):
@@ -131,7 +176,8 @@ class AuthService:
     async def after_password_reset(self, email: str) -> None:
         """ Set password as reset """
 
-        new_password = self._password_hasher(self._password_generator())
+        new_password = self._password_generator()
+        hash_password = await self._password_hasher(new_password)
 
-        await self.auth_repository.update(email, {"hash_password": new_password})
+        await self.auth_repository.set_password_hash(email, hash_password)
         await EmailService().send_mail(email, "new_password", new_password)
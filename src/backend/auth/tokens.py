@@ -0,0 +1,202 @@
+import time
+import uuid
+import asyncio
+import logging
+from enum import Enum
+from typing import Any, Optional
+
+from ..database import get_redis, subscriber, BloomFilter, RedisScript, redis_breaker
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_TTL = 7 * 24 * 60 * 60
+REVOKED_FAMILIES_KEY = "refresh:revoked"
+REVOCATION_CHANNEL = "refresh:revoked"
+
+_ROTATE_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'jti')
+if not current then
+    return -1
+end
+if current ~= ARGV[1] then
+    redis.call('DEL', KEYS[1])
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[3])
+    redis.call('PUBLISH', ARGV[5], ARGV[3])
+    return 0
+end
+redis.call('HSET', KEYS[1], 'jti', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[6])
+return 1
+"""
+
+
+class RotationResult(Enum):
+    """Outcome of presenting a refresh token"""
+
+    ROTATED = 1
+    REUSED = 0
+    UNKNOWN = -1
+
+
+class RefreshTokenStore:
+    """Refresh token families in Redis with an in-process revocation filter
+
+    Every login starts a family; each refresh swaps the family's current jti.
+    Presenting an older jti means the token was stolen or replayed, so the
+    whole family is revoked. Revoked family ids are mirrored into a local
+    Bloom filter, so checking a family that was never revoked needs no
+    network round trip.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, rebuild_interval: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+
+        self._filter = BloomFilter(capacity, error_rate)
+        self._captured: Optional[list[str]] = None
+        self._ready = False
+        self._task: Optional[asyncio.Task] = None
+        self._rotate = RedisScript(_ROTATE_SCRIPT)
+        self.filter_hits = 0
+        self.filter_skips = 0
+        self.unstored_families = 0
+
+    @staticmethod
+    def _family_key(family_id: str) -> str:
+        return f"refresh:family:{family_id}"
+
+    async def issue(self, email: str) -> tuple[str, str]:
+        """Start a new token family and return its id and first jti
+
+        If Redis is unavailable the login still succeeds: the access token
+        works, and the refresh token is rejected on rotation, so the user
+        logs in again once it expires.
+        """
+        family_id, jti = uuid.uuid4().hex, uuid.uuid4().hex
+
+        async def store() -> None:
+            async with get_redis().pipeline(transaction=True) as pipe:
+                pipe.hset(self._family_key(family_id), mapping={"email": email, "jti": jti})
+                pipe.expire(self._family_key(family_id), REFRESH_TOKEN_TTL)
+                await pipe.execute()
+
+        try:
+            await redis_breaker.call(store)
+        except Exception as exc:
+            self.unstored_families += 1
+            logger.warning(f"Refresh token family {family_id} not stored, Redis unavailable: {exc!r}")
+
+        return family_id, jti
+
+    async def rotate(self, family_id: str, jti: str) -> tuple[RotationResult, Optional[str]]:
+        """Swap the family's jti, revoking the family if an old one is replayed"""
+        new_jti = uuid.uuid4().hex
+        result = await self._rotate(
+            keys=[self._family_key(family_id), REVOKED_FAMILIES_KEY],
+            args=[jti, new_jti, family_id, int(time.time()) + REFRESH_TOKEN_TTL, REVOCATION_CHANNEL, REFRESH_TOKEN_TTL],
+        )
+
+        result = RotationResult(int(result))
+        if result is RotationResult.REUSED:
+            self._add(family_id)
+            logger.warning(f"Refresh token reuse detected, family {family_id} revoked")
+
+        return result, new_jti if result is RotationResult.ROTATED else None
+
+    async def revoke(self, family_id: str) -> None:
+        """Revoke every token of a family"""
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.delete(self._family_key(family_id))
+            pipe.zadd(REVOKED_FAMILIES_KEY, {family_id: int(time.time()) + REFRESH_TOKEN_TTL})
+            pipe.publish(REVOCATION_CHANNEL, family_id)
+            await pipe.execute()
+
+        self._add(family_id)
+
+    async def is_revoked(self, family_id: Optional[str]) -> bool:
+        """Check a family, going to Redis only when the filter reports a possible match"""
+        if family_id is None:
+            return False
+
+        if self._ready and family_id not in self._filter:
+            self.filter_skips += 1
+            return False
+
+        self.filter_hits += 1
+        try:
+            score = await redis_breaker.call(lambda: get_redis().zscore(REVOKED_FAMILIES_KEY, family_id))
+        except Exception:
+            # The filter said "maybe"; without Redis to confirm, trust it
+            return self._ready
+        return score is not None and score > time.time()
+
+    def _add(self, family_id: str) -> None:
+        self._filter.add(family_id)
+        if self._captured is not None:
+            self._captured.append(family_id)
+
+    def _on_revoked(self, family_id: str) -> None:
+        self._add(family_id)
+
+    async def rebuild(self) -> None:
+        """Reload the filter from Redis, dropping families whose tokens have expired"""
+        now = int(time.time())
+        # Revocations arriving while the set is read would land in the old filter
+        self._captured = []
+        try:
+            await get_redis().zremrangebyscore(REVOKED_FAMILIES_KEY, "-inf", now)
+            family_ids = await get_redis().zrangebyscore(REVOKED_FAMILIES_KEY, now, "+inf")
+
+            bloom = BloomFilter(self.capacity, self.error_rate)
+            for family_id in [*family_ids, *self._captured]:
+                bloom.add(family_id)
+
+            self._filter = bloom
+        finally:
+            self._captured = None
+        self._ready = True
+        logger.info(f"Revocation filter rebuilt with {len(family_ids)} families")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.rebuild_interval)
+            try:
+                await self.rebuild()
+            except Exception:
+                logger.exception("Failed to rebuild revocation filter")
+
+    async def start(self) -> None:
+        try:
+            await self.rebuild()
+        except Exception:
+            logger.exception("Failed to load revocation filter, checks will go to Redis")
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self._ready,
+            "filter_entries": self._filter.count,
+            "filter_hits": self.filter_hits,
+            "filter_skips": self.filter_skips,
+            "unstored_families": self.unstored_families,
+        }
+
+
+_settings = get_settings().auth
+
+refresh_token_store = RefreshTokenStore(
+    capacity=_settings.revocation_filter_capacity,
+    error_rate=_settings.revocation_filter_error_rate,
+    rebuild_interval=_settings.revocation_filter_rebuild_interval,
+)
+subscriber.subscribe(REVOCATION_CHANNEL, refresh_token_store._on_revoked)
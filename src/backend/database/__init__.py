@@ -1,15 +1,43 @@
-from .connection_postgres import engine, SessionLocal, get_db, DatabaseSession
-from .connection_redis import redis
+from .connection_postgres import (
+    init_engine,
+    dispose_engine,
+    get_engine,
+    SessionLocal,
+    get_db,
+    pool_stats,
+    DatabaseSession,
+)
+from .replicas import ReadSessionLocal, replica_router
+from .connection_redis import init_redis, close_redis, get_redis, get_redis_binary, RedisScript, redis_breaker
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
 from .base import Base, CustomBase
+from .local_cache import LocalTTLCache
+from .bloom import BloomFilter
+from .pubsub import subscriber
 from .lifespan import lifespan_check
 
 __all__ = [
-    "engine",
+    "init_engine",
+    "dispose_engine",
+    "get_engine",
     "SessionLocal",
+    "ReadSessionLocal",
+    "replica_router",
     "get_db",
+    "pool_stats",
     "Base",
+    "BloomFilter",
     "CustomBase",
     "DatabaseSession",
+    "LocalTTLCache",
     "lifespan_check",
-    "redis",
+    "init_redis",
+    "close_redis",
+    "get_redis",
+    "get_redis_binary",
+    "RedisScript",
+    "redis_breaker",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "subscriber",
 ]
@@ -1,3 +1,6 @@
+from operator import attrgetter
+from typing import Callable
+
 from sqlalchemy.orm import DeclarativeBase
 
 
@@ -8,6 +11,20 @@ class Base(DeclarativeBase):
 class CustomBase(Base):
     __abstract__ = True
 
+    @classmethod
+    def _column_accessor(cls) -> tuple[tuple[str, ...], Callable]:
+        """ Column names and a getter for them, computed once per model """
+        accessor = cls.__dict__.get("_column_accessor_cache")
+
+        if accessor is None:
+            names = tuple(c.key for c in cls.__table__.columns)
+            getter = attrgetter(*names)
+            accessor = (names, getter if len(names) > 1 else lambda obj: (getter(obj),))
+            cls._column_accessor_cache = accessor
+
+        return accessor
+
     def model_dump(self) -> dict:
         """ Method to dump model to dictionary """
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        names, getter = self._column_accessor()
+        return dict(zip(names, getter(self)))
@@ -0,0 +1,55 @@
+import math
+import hashlib
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, using double hashing on blake2b"""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @classmethod
+    def from_redis(cls, capacity: int, error_rate: float, bitmap: bytes, count: int = 0) -> "BloomFilter":
+        """Load a filter with the same parameters from a Redis bitmap written by to_redis()"""
+        bloom = cls(capacity, error_rate)
+        if len(bitmap) != len(bloom.bits):
+            raise ValueError(f"Expected a {len(bloom.bits)} byte bitmap, got {len(bitmap)}")
+        bloom.bits = bytearray(bitmap)
+        bloom.count = count
+        return bloom
+
+    @staticmethod
+    def bit_offset(position: int) -> int:
+        """Redis SETBIT offset of a bit position; Redis numbers bits from the most significant"""
+        return (position & ~7) | (7 - (position & 7))
+
+    def positions(self, item: str) -> list[int]:
+        return list(self._positions(item))
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def to_redis(self) -> bytes:
+        """The bits as a Redis string; SETBIT on bit_offset() of a position updates them in place"""
+        return bytes(self.bits)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def clear(self) -> None:
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
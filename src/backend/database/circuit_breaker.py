@@ -0,0 +1,134 @@
+import time
+import asyncio
+import logging
+from enum import Enum
+from typing import Any, Awaitable, Callable, Optional
+
+from ..metrics import CIRCUIT_BREAKER_STATE
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Exception raised when a call is rejected because the circuit is open."""
+
+    ...
+
+
+class CircuitState(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """Fails calls fast after repeated failures instead of waiting on a sick dependency
+
+    Every call runs under a timeout. After failure_threshold consecutive
+    failures the circuit opens and calls are rejected immediately; after
+    reset_timeout seconds a single probe is let through (half-open), and its
+    outcome closes or reopens the circuit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 5.0,
+        timeout: float = 0.1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+
+        self.state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._state_gauge = CIRCUIT_BREAKER_STATE.labels(name)
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def configure(self, failure_threshold: int, reset_timeout: float, timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+
+    def _set_state(self, state: CircuitState) -> None:
+        if state is self.state:
+            return
+
+        logger.warning(f"Circuit {self.name} is now {state.name.lower().replace('_', '-')}.")
+        self.state = state
+        self._state_gauge.set(state.value)
+
+    @property
+    def is_open(self) -> bool:
+        return self.state is CircuitState.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def _admit(self) -> bool:
+        if self.state is CircuitState.CLOSED:
+            return True
+
+        if self.state is CircuitState.OPEN:
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._set_state(CircuitState.HALF_OPEN)
+
+        if self._probing:
+            return False
+        self._probing = True
+        return True
+
+    def _on_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        self._set_state(CircuitState.CLOSED)
+
+    def _on_failure(self) -> None:
+        self.failures += 1
+        self._failures += 1
+        self._probing = False
+
+        if self.state is CircuitState.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state is not CircuitState.OPEN:
+                self.trips += 1
+            self._opened_at = time.monotonic()
+            self._set_state(CircuitState.OPEN)
+
+    async def call(self, func: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Any:
+        """Run func() under the breaker, raising CircuitOpenError if it is open"""
+        if not self._admit():
+            self.rejected += 1
+            raise CircuitOpenError(f"Circuit {self.name} is open")
+
+        self.calls += 1
+        try:
+            result = await asyncio.wait_for(func(), timeout=timeout or self.timeout)
+        except asyncio.CancelledError:
+            self._probing = False
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self._on_failure()
+            raise
+        except Exception:
+            self._on_failure()
+            raise
+
+        self._on_success()
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state.name.lower(),
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "trips": self.trips,
+        }
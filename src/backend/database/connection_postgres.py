@@ -1,33 +1,122 @@
-import os
-from typing import AsyncGenerator, Annotated
+import time
+import asyncio
+from contextlib import AsyncExitStack
+from typing import AsyncGenerator, Annotated, Any, Optional, Sequence
 
-from dotenv import load_dotenv
 from logging import getLogger
 from fastapi import Depends
-from sqlalchemy import text
+from sqlalchemy import exc, text
+from sqlalchemy.sql import Executable
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 
-load_dotenv()
+from ..settings import DatabaseSettings
+from ..metrics import DB_POOL_CHECKED_OUT, DB_POOL_OVERFLOW, DB_POOL_WAIT
 
-DATABASE_URL = os.getenv("DATABASE_URL")
 logger = getLogger(__name__)
 
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set.")
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-)
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection
 
-SessionLocal = async_sessionmaker(
-    bind=engine,
-    expire_on_commit=False,
-)
+    Only checkouts that found the pool exhausted count as waits.
+    """
+
+    waits = 0
+    wait_seconds_total = 0.0
+    wait_seconds_max = 0.0
+    timeouts = 0
+
+    def _update_gauges(self) -> None:
+        # Set on every checkout and checkin, so each worker's value stays
+        # current however the scrapes are routed
+        DB_POOL_CHECKED_OUT.set(self.checkedout())
+        DB_POOL_OVERFLOW.set(max(0, self.overflow()))
+
+    def _exhausted(self) -> bool:
+        """No idle connection and no overflow left: a checkout has to wait"""
+        return self.checkedin() == 0 and -1 < self._max_overflow <= self.overflow()
+
+    def _do_get(self):
+        if not self._exhausted():
+            connection = super()._do_get()
+            self._update_gauges()
+            return connection
+
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            InstrumentedQueuePool.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            InstrumentedQueuePool.waits += 1
+            InstrumentedQueuePool.wait_seconds_total += waited
+            InstrumentedQueuePool.wait_seconds_max = max(InstrumentedQueuePool.wait_seconds_max, waited)
+            DB_POOL_WAIT.observe(waited)
+            self._update_gauges()
+
+    def _do_return_conn(self, record) -> None:
+        super()._do_return_conn(record)
+        self._update_gauges()
+
+
+_settings: Optional[DatabaseSettings] = None
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker[AsyncSession]] = None
+
+
+def init_engine(settings: DatabaseSettings) -> AsyncEngine:
+    """Create the engine and session factory, called from the lifespan"""
+    global _settings, _engine, _sessionmaker
+
+    if not settings.url:
+        raise RuntimeError("DATABASE_URL is not set.")
+
+    _settings = settings
+    _engine = create_async_engine(
+        settings.url,
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.pool_size,
+        max_overflow=settings.max_overflow,
+        pool_timeout=settings.pool_timeout,
+        pool_recycle=settings.pool_recycle,
+        pool_pre_ping=settings.pool_pre_ping,
+        connect_args={"prepared_statement_cache_size": settings.statement_cache_size},
+    )
+    _sessionmaker = async_sessionmaker(
+        bind=_engine,
+        expire_on_commit=False,
+    )
+    return _engine
+
+
+async def dispose_engine() -> None:
+    global _engine, _sessionmaker
+
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = _sessionmaker = None
+
+
+def get_engine() -> AsyncEngine:
+    if _engine is None:
+        raise RuntimeError("Database engine is not initialized, the app lifespan has not started.")
+    return _engine
+
+
+def SessionLocal() -> AsyncSession:
+    """Open a session on the current engine"""
+    if _sessionmaker is None:
+        raise RuntimeError("Database engine is not initialized, the app lifespan has not started.")
+    return _sessionmaker()
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -35,13 +124,44 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
-async def check_db_connection() -> None:
-    try:
-        async with engine.begin() as conn:
-            await conn.execute(text("SELECT 1"))
-        logger.info("✅ Successfully connected to database")
-    except Exception:
-        logger.exception("❌ Failed to connect to database")
+async def prewarm_pool(statements: Sequence[tuple[Executable, dict]] = ()) -> None:
+    """Open the minimum number of connections and prepare hot statements on each, raising if the database is unreachable"""
+    engine = get_engine()
+    count = min(_settings.prewarm_connections, _settings.pool_size)
+
+    async def warm(conn) -> None:
+        await conn.execute(text("SELECT 1"))
+        for statement, params in statements:
+            await conn.execute(statement, params)
+        await conn.rollback()
+
+    async with AsyncExitStack() as stack:
+        connections = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(count))
+        )
+        await asyncio.gather(*(warm(conn) for conn in connections))
+    logger.info(f"✅ Successfully connected to database, {count} connections pre-warmed")
+
+
+def pool_stats() -> dict[str, Any]:
+    """Live pool saturation numbers"""
+    if _engine is None:
+        return {}
+
+    pool = _engine.pool
+    waits = InstrumentedQueuePool.waits
+
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": _settings.max_overflow,
+        "waits": waits,
+        "wait_seconds_avg": InstrumentedQueuePool.wait_seconds_total / waits if waits else 0.0,
+        "wait_seconds_max": InstrumentedQueuePool.wait_seconds_max,
+        "timeouts": InstrumentedQueuePool.timeouts,
+    }
 
 
 DatabaseSession = Annotated[AsyncSession, Depends(get_db)]
@@ -1,23 +1,92 @@
-import os
+import asyncio
 import logging
+from typing import Any, Optional, Sequence
 
-from dotenv import load_dotenv
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 
-load_dotenv()
+from .circuit_breaker import CircuitBreaker
+from ..settings import RedisSettings
 
-REDIS_URL = os.getenv("REDIS_URL")
 logger = logging.getLogger(__name__)
 
-if not REDIS_URL:
-    raise RuntimeError("REDIS_URL is not set in environment variables.")
+_redis: Optional[Redis] = None
+_redis_binary: Optional[Redis] = None
 
-redis: Redis = Redis.from_url(REDIS_URL, decode_responses=True)
+# Guards latency-sensitive cache traffic; blocking reads such as the email
+# worker's XREADGROUP go around it and only get the socket timeout.
+redis_breaker = CircuitBreaker("redis")
+
+
+def init_redis(settings: RedisSettings) -> Redis:
+    """Create the Redis clients, called from the lifespan"""
+    global _redis, _redis_binary
+
+    if not settings.url:
+        raise RuntimeError("REDIS_URL is not set in environment variables.")
+
+    options = {
+        "socket_timeout": settings.socket_timeout,
+        "socket_connect_timeout": settings.socket_connect_timeout,
+    }
+    _redis = Redis.from_url(settings.url, decode_responses=True, **options)
+    _redis_binary = Redis.from_url(settings.url, decode_responses=False, **options)
+    redis_breaker.configure(
+        failure_threshold=settings.breaker_failure_threshold,
+        reset_timeout=settings.breaker_reset_timeout,
+        timeout=settings.operation_timeout,
+    )
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis, _redis_binary
+
+    for client in (_redis, _redis_binary):
+        if client is not None:
+            await client.aclose()
+    _redis = _redis_binary = None
+
+
+def get_redis() -> Redis:
+    """Text-mode Redis client"""
+    if _redis is None:
+        raise RuntimeError("Redis is not initialized, the app lifespan has not started.")
+    return _redis
+
+
+def get_redis_binary() -> Redis:
+    """Bytes-mode Redis client, used for binary cache payloads"""
+    if _redis_binary is None:
+        raise RuntimeError("Redis is not initialized, the app lifespan has not started.")
+    return _redis_binary
+
+
+class RedisScript:
+    """Lua script that runs against whichever Redis client is current"""
+
+    def __init__(self, source: str) -> None:
+        # Bytes skip the encoder lookup on a registered client, there is none
+        # at import time; the client is passed per call instead
+        self._script = AsyncScript(None, source.encode())
+
+    async def __call__(self, keys: Sequence[str] = (), args: Sequence[Any] = ()) -> Any:
+        return await self._script(keys=list(keys), args=list(args), client=get_redis())
+
+
+async def prewarm_redis(connections: int) -> None:
+    """Open connections on both clients ahead of traffic; concurrent PINGs each take one from the pool"""
+    await asyncio.gather(*(
+        client.ping()
+        for client in (get_redis(), get_redis_binary())
+        for _ in range(connections)
+    ))
+    logger.info(f"✅ Redis pools pre-warmed with {connections} connections each")
 
 
 async def check_redis_connection():
     try:
-        pong = await redis.ping()
+        pong = await get_redis().ping()
 
         if pong:
             logger.info("✅ Successfully connected to Redis")
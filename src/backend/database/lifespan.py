@@ -1,14 +1,82 @@
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
-from .connection_postgres import check_db_connection, engine
-from .connection_redis import check_redis_connection
+from .connection_postgres import init_engine, dispose_engine, prewarm_pool
+from .connection_redis import init_redis, close_redis, check_redis_connection, prewarm_redis
+from .pubsub import subscriber
+from .replicas import replica_router
+from ..settings import get_settings
+from ..tasks import drain
+from ..warmup import warmup
 
 
 @asynccontextmanager
 async def lifespan_check(app: FastAPI):
-    await check_db_connection()
+    from ..auth.cache import user_cache  # noqa: F401 - registers its invalidation handler
+    from ..auth.existence import email_filter
+    from ..auth.hashing import password_pool
+    from ..auth.last_login import last_login_buffer, BULK_UPDATE_LAST_LOGIN
+    from ..auth.repository import WARMUP_STATEMENTS
+    from ..auth.service import AuthService
+    from ..auth.tokens import refresh_token_store
+    from ..email.transport import create_email_transport
+    from ..email.worker import EmailDeliveryWorker
+
+    settings = getattr(app.state, "settings", None) or get_settings()
+    init_engine(settings.database)
+    init_redis(settings.redis)
+    replica_router.init(settings.database)
+
+    await replica_router.start()
     await check_redis_connection()
+    await password_pool.calibrate(
+        target=settings.auth.password_hash_target_ms / 1000,
+        min_rounds=settings.auth.password_hash_min_rounds,
+        max_rounds=settings.auth.password_hash_max_rounds,
+        rounds=settings.auth.password_hash_rounds,
+    )
+    password_pool.start()
+    subscriber.start()
+    await refresh_token_store.start()
+    await email_filter.start()
+    last_login_buffer.start()
+
+    warmup.register("database", lambda: prewarm_pool([
+        *WARMUP_STATEMENTS,
+        (BULK_UPDATE_LAST_LOGIN, {"emails": [], "logins": []}),
+    ]), required=True)
+    warmup.register("redis", lambda: prewarm_redis(settings.redis.prewarm_connections), required=True)
+    warmup.register("password_hashing", password_pool.warm, required=True)
+    warmup.register("tokens", lambda: asyncio.to_thread(AuthService.warm_tokens))
+    warmup.start()
+
+    app.state.email_transport = create_email_transport(settings=settings.email)
+
+    email_worker = None
+    email_worker_task = None
+    if settings.email.worker_in_process:
+        email_worker = EmailDeliveryWorker.from_settings(app.state.email_transport, settings.email)
+        email_worker_task = asyncio.create_task(email_worker.run())
+
     yield
-    await engine.dispose()
+
+    await warmup.stop()
+
+    if email_worker is not None:
+        email_worker_task.cancel()
+        await asyncio.gather(email_worker_task, return_exceptions=True)
+        await email_worker.stop()
+
+    await app.state.email_transport.close()
+
+    await last_login_buffer.stop()
+    await drain()
+    await refresh_token_store.stop()
+    await email_filter.stop()
+    await subscriber.stop()
+    await password_pool.shutdown()
+    await close_redis()
+    await replica_router.stop()
+    await dispose_engine()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from .connection_redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+MessageHandler = Callable[[str], Awaitable[None] | None]
+ReconnectHandler = Callable[[], None]
+
+
+class RedisSubscriber:
+    """Single pub/sub connection that dispatches channel messages to handlers"""
+
+    def __init__(self) -> None:
+        self._handlers: dict[str, list[MessageHandler]] = {}
+        self._reconnect_handlers: list[ReconnectHandler] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, handler: MessageHandler) -> None:
+        """Register a handler; must be called before start()"""
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reconnect(self, handler: ReconnectHandler) -> None:
+        """Register a callback run after resubscribing; messages sent while disconnected are lost"""
+        self._reconnect_handlers.append(handler)
+
+    def _reconnected(self) -> None:
+        for handler in self._reconnect_handlers:
+            try:
+                handler()
+            except Exception:
+                logger.exception("Pub/sub reconnect handler failed")
+
+    async def _dispatch(self, channel: str, data: str) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                result = handler(data)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception(f"Pub/sub handler for {channel} failed")
+
+    async def _listen(self) -> None:
+        lost = False
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(*self._handlers)
+                logger.info(f"Subscribed to {', '.join(self._handlers)}")
+                if lost:
+                    lost = False
+                    self._reconnected()
+
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        await self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Pub/sub connection lost, reconnecting")
+                lost = True
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def start(self) -> None:
+        if self._task is None and self._handlers:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+
+subscriber = RedisSubscriber()
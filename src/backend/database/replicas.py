@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from logging import getLogger
+from typing import Any, AsyncIterator, Hashable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from .connection_postgres import SessionLocal
+from .connection_redis import get_redis, redis_breaker
+from .local_cache import LocalTTLCache
+from ..settings import DatabaseSettings
+
+logger = getLogger(__name__)
+
+WRITTEN_KEY = "replica:written:{}"
+
+# Seconds behind the primary; 0 when the replica has replayed everything it
+# received (an idle primary would otherwise look like growing lag) or when
+# the URL points at a primary, which is how a single local instance is tested.
+REPLICA_LAG = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+@dataclass
+class Replica:
+    url: str
+    engine: AsyncEngine
+    sessionmaker: async_sessionmaker[AsyncSession]
+    healthy: bool = False
+    lag: Optional[float] = None
+    failures: int = field(default=0)
+
+
+class ReplicaRouter:
+    """Routes read-only sessions to healthy replicas, round-robin
+
+    Replicas are polled in the background; one that fails the check or lags
+    more than max_lag seconds is skipped until it recovers. Keys written
+    recently by any worker are read from the primary: reads by key fill the
+    shared user cache, and a worker that missed the write would otherwise put
+    an older row back into it. The marker is kept in Redis, and locally so
+    the writing worker needs no round trip; when Redis cannot answer, the
+    read goes to the primary. With no healthy replica every read goes to the
+    primary.
+    """
+
+    def __init__(self) -> None:
+        self.replicas: list[Replica] = []
+        self.max_lag = 0.0
+        self.check_interval = 0.0
+
+        self._cycle = itertools.cycle(())
+        self._written = LocalTTLCache(maxsize=10_000, ttl=0)
+        self._task: Optional[asyncio.Task] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.read_your_writes = 0
+
+    def init(self, settings: DatabaseSettings) -> None:
+        """Create one engine per DATABASE_REPLICA_URLS entry"""
+        self.max_lag = settings.replica_max_lag
+        self.check_interval = settings.replica_check_interval
+        self._written = LocalTTLCache(maxsize=10_000, ttl=self.max_lag + self.check_interval)
+
+        for url in filter(None, (item.strip() for item in settings.replica_urls.split(","))):
+            engine = create_async_engine(
+                url,
+                echo=False,
+                pool_size=settings.pool_size,
+                max_overflow=settings.max_overflow,
+                pool_timeout=settings.pool_timeout,
+                pool_recycle=settings.pool_recycle,
+                pool_pre_ping=settings.pool_pre_ping,
+                connect_args={"prepared_statement_cache_size": settings.statement_cache_size},
+            )
+            self.replicas.append(Replica(url, engine, async_sessionmaker(bind=engine, expire_on_commit=False)))
+
+        self._cycle = itertools.cycle(self.replicas)
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                replica.lag = float((await conn.execute(REPLICA_LAG)).scalar_one())
+            healthy = replica.lag <= self.max_lag
+        except Exception as exc:
+            replica.failures += 1
+            replica.lag = None
+            healthy = False
+            logger.warning(f"Replica {replica.engine.url.host} health check failed: {exc}")
+
+        if healthy != replica.healthy:
+            state = "healthy" if healthy else f"unhealthy (lag {replica.lag})"
+            logger.info(f"Replica {replica.engine.url.host} is {state}.")
+        replica.healthy = healthy
+
+    async def check(self) -> None:
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+    async def start(self) -> None:
+        """Check every replica once, then keep polling in the background"""
+        if not self.replicas or self._task is not None:
+            return
+
+        await self.check()
+        self._task = asyncio.create_task(self._run(), name="replica-health")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+        for replica in self.replicas:
+            await replica.engine.dispose()
+        self.replicas = []
+        self._cycle = itertools.cycle(())
+
+    async def mark_written(self, key: Hashable) -> None:
+        """Pin reads of a key to the primary, on every worker, until replicas have caught up"""
+        if not self.replicas:
+            return
+
+        self._written.set(key, True)
+        try:
+            await redis_breaker.call(
+                lambda: get_redis().set(WRITTEN_KEY.format(key), 1, px=int(self._written.ttl * 1000))
+            )
+        except Exception as exc:
+            logger.warning(f"Failed to share the write marker for {key}: {exc!r}")
+
+    async def _recently_written(self, key: Hashable) -> bool:
+        if self._written.get(key):
+            return True
+
+        try:
+            return bool(await redis_breaker.call(lambda: get_redis().exists(WRITTEN_KEY.format(key))))
+        except Exception:
+            return True
+
+    def _pick(self) -> Optional[Replica]:
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)
+            if replica.healthy:
+                return replica
+        return None
+
+    async def session(self, key: Optional[Hashable] = None) -> AsyncSession:
+        if key is not None and self.replicas and await self._recently_written(key):
+            self.read_your_writes += 1
+            return SessionLocal()
+
+        replica = self._pick()
+        if replica is None:
+            self.primary_reads += 1
+            return SessionLocal()
+
+        self.replica_reads += 1
+        return replica.sessionmaker()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "replicas": [
+                {"host": replica.engine.url.host, "healthy": replica.healthy, "lag_seconds": replica.lag, "failures": replica.failures}
+                for replica in self.replicas
+            ],
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "read_your_writes": self.read_your_writes,
+        }
+
+
+replica_router = ReplicaRouter()
+
+
+@asynccontextmanager
+async def ReadSessionLocal(key: Optional[Hashable] = None) -> AsyncIterator[AsyncSession]:
+    """Open a read-only session on a replica, falling back to the primary
+
+    Pass the key being read (e.g. an email) to get read-your-writes routing.
+    """
+    async with await replica_router.session(key) as session:
+        yield session
@@ -1,2 +1,4 @@
 from .endpoints import email_router
-from .service import EmailService
\ No newline at end of file
+from .service import EmailService
+from .transport import EmailTransport, EmailMessage, create_email_transport
+from .dispatcher import BatchingDispatcher
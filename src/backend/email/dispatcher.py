@@ -0,0 +1,93 @@
+import time
+import asyncio
+import logging
+from typing import Any, Optional
+
+from .transport import EmailTransport, EmailMessage
+from ..metrics import EMAIL_BATCH_SIZE, EMAIL_SEND_DURATION, EMAIL_SEND_FAILURES
+
+logger = logging.getLogger(__name__)
+
+
+class BatchingDispatcher:
+    """Collects outgoing messages for a short window and sends them as one batch
+
+    Callers await their own message; the batch is flushed when it reaches
+    max_batch messages or max_delay seconds after its first message, and each
+    caller gets back the result for its recipient.
+    """
+
+    def __init__(self, transport: EmailTransport, max_batch: int = 50, max_delay: float = 0.05) -> None:
+        self.transport = transport
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+
+        self._pending: list[tuple[EmailMessage, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: set[asyncio.Task] = set()
+        self._send_duration = EMAIL_SEND_DURATION.labels(type(transport).__name__)
+        self._send_failures = EMAIL_SEND_FAILURES.labels(type(transport).__name__)
+        self.batches = 0
+        self.messages = 0
+
+    def submit(self, message: EmailMessage) -> asyncio.Future:
+        """Queue a message for the current batch"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((message, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self._flush)
+
+        return future
+
+    async def send(self, message: EmailMessage) -> None:
+        """Send a message as part of a batch, raising its delivery error"""
+        await self.submit(message)
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._deliver(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _deliver(self, batch: list[tuple[EmailMessage, asyncio.Future]]) -> None:
+        started = time.perf_counter()
+        try:
+            results = await self.transport.send_batch([message for message, _ in batch])
+        except Exception as exc:
+            results = [exc] * len(batch)
+        finally:
+            self._send_duration.observe(time.perf_counter() - started)
+
+        self.batches += 1
+        self.messages += len(batch)
+        EMAIL_BATCH_SIZE.observe(len(batch))
+
+        for (_, future), error in zip(batch, results):
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                self._send_failures.inc()
+                future.set_exception(error)
+
+    async def close(self) -> None:
+        """Send whatever is pending and wait for in-flight batches"""
+        self._flush()
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "messages": self.messages,
+            "average_batch_size": self.messages / self.batches if self.batches else 0.0,
+        }
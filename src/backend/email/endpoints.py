@@ -1,10 +1,11 @@
 import logging
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
 
 from .service import EmailService
 from .schemas import EmailChallengeSchema, EmailVerifyChallengeSchema
 from ..database import DatabaseSession
+from ..ratelimit import rate_limiter
 
 logger = logging.getLogger(__name__)
 email_router = APIRouter(tags=["email"])
@@ -12,8 +13,10 @@ email_router = APIRouter(tags=["email"])
 
 @email_router.post("/challenge", response_model=EmailChallengeSchema)
 async def verify_challenge(
+    request: Request,
     challenge: EmailVerifyChallengeSchema,
     database: DatabaseSession,
 ):
+    await rate_limiter.hit("email_challenge", request, email=challenge.email)
     email_service = EmailService()
     return await email_service.verify_challenge(challenge, database)
@@ -79,4 +79,58 @@ RESET_PASSWORD_HTML_CODE = """
     </table>
   </body>
 </html>
-"""
\ No newline at end of file
+"""
+NEW_PASSWORD_HTML_CODE = """
+<html>
+  <body style="font-family: Arial, sans-serif; background-color: #f4f4f4; margin: 0; padding: 0;">
+    <table width="100%" cellspacing="0" cellpadding="0">
+      <tr>
+        <td align="center" style="padding: 40px 0;">
+          <table width="600" style="background: white; padding: 40px; border-radius: 10px; box-shadow: 0 2px 8px rgba(0,0,0,0.1);">
+            <tr>
+              <td align="center" style="padding-bottom: 20px;">
+                <h1 style="color: #333;">Your Password Was Reset</h1>
+              </td>
+            </tr>
+            <tr>
+              <td style="font-size: 16px; color: #555; padding-bottom: 30px;">
+                Your password has been reset. You can now log in with the following password:
+              </td>
+            </tr>
+            <tr>
+              <td align="center" style="padding-bottom: 30px;">
+                <div style="display: inline-block; padding: 15px 30px; font-size: 24px; font-weight: bold; color: #4CAF50; background-color: #e8f5e9; border-radius: 8px; letter-spacing: 2px;">
+                  {{PASSWORD}}
+                </div>
+              </td>
+            </tr>
+            <tr>
+              <td style="font-size: 14px; color: #999;">
+                We recommend changing it after you log in.
+              </td>
+            </tr>
+            <tr>
+              <td style="font-size: 12px; color: #bbb; padding-top: 20px;">
+                If you didn’t request a password reset, please contact support.
+              </td>
+            </tr>
+          </table>
+        </td>
+      </tr>
+    </table>
+  </body>
+</html>
+"""
+TEMPLATES = {
+    "register": REGISTER_HTML_CODE,
+    "reset_password": RESET_PASSWORD_HTML_CODE,
+    "new_password": NEW_PASSWORD_HTML_CODE,
+}
+
+
+def render(template: str, params: dict[str, str]) -> str:
+    """Fill the {{NAME}} placeholders of a template"""
+    html = TEMPLATES[template]
+    for name, value in params.items():
+        html = html.replace("{{" + name + "}}", str(value))
+    return html
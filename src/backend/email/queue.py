@@ -0,0 +1,63 @@
+import json
+import uuid
+import logging
+from datetime import datetime, timezone
+
+from ..database import get_redis
+from ..metrics import EMAIL_DEAD_LETTERS
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+EMAIL_STREAM = get_settings().email.stream
+EMAIL_DEAD_LETTER = get_settings().email.dead_letter
+EMAIL_DEAD_LETTER_MAX_LENGTH = get_settings().email.dead_letter_max_length
+EMAIL_CONSUMER_GROUP = "email-workers"
+
+
+class EmailQueue:
+    """Durable outbound email queue backed by a Redis stream"""
+
+    @staticmethod
+    async def enqueue(to_email: str, subject: str, template: str, params: dict[str, str]) -> str:
+        """Append a message to the outbox and return its idempotency id
+
+        Messages carry the template name and its parameters rather than the
+        rendered HTML, so the worker can batch recipients of the same template.
+        """
+        message_id = uuid.uuid4().hex
+
+        await get_redis().xadd(
+            EMAIL_STREAM,
+            {
+                "message_id": message_id,
+                "to_email": to_email,
+                "subject": subject,
+                "template": template,
+                "params": json.dumps(params),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            },
+        )
+
+        logger.info(f"Email {message_id} queued for {to_email}.")
+        return message_id
+
+    @staticmethod
+    async def dead_letter(fields: dict, error: str) -> None:
+        """Move a message that exhausted its retries to the capped dead-letter list
+
+        Template parameters carry one-time codes and generated passwords, and
+        the list outlives them, so only the parameter names are kept.
+        """
+        entry = {**fields, "error": error}
+        if "params" in entry:
+            entry["params"] = json.dumps(dict.fromkeys(json.loads(entry["params"]), "[redacted]"))
+        if "html_content" in entry:
+            entry["html_content"] = "[redacted]"
+
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.lpush(EMAIL_DEAD_LETTER, json.dumps(entry))
+            pipe.ltrim(EMAIL_DEAD_LETTER, 0, EMAIL_DEAD_LETTER_MAX_LENGTH - 1)
+            await pipe.execute()
+        EMAIL_DEAD_LETTERS.inc()
+        logger.error(f"Email {fields.get('message_id')} moved to dead-letter list: {error}")
@@ -1,53 +1,77 @@
-import os
-import json
 import logging
 from random import randint
 
-import sib_api_v3_sdk
-from dotenv import load_dotenv
-
-from .html import REGISTER_HTML_CODE, RESET_PASSWORD_HTML_CODE
-from ..database import redis, DatabaseSession
-
-load_dotenv()
+from .queue import EmailQueue
+from ..database import get_redis, DatabaseSession, RedisScript
+from ..settings import get_settings
 
 logger = logging.getLogger(__name__)
 
+CHALLENGE_TTL = 900
+CHALLENGE_MAX_ATTEMPTS = get_settings().email.challenge_max_attempts
+
+# Compares the code and counts failed attempts in one step. A correct code
+# claims the challenge, which is deleted once its action succeeded and
+# released if the action failed. Returns {status, type_of_challenge}:
+# 1 verified, 0 wrong code, -1 expired or missing, -2 too many attempts
+# (challenge discarded), -3 already being used by another request.
+_VERIFY_CHALLENGE_SCRIPT = """
+local challenge = redis.call('HMGET', KEYS[1], 'code', 'type_of_challenge')
+if not challenge[1] then
+    return {-1, ''}
+end
+if challenge[1] == ARGV[1] then
+    if redis.call('HSETNX', KEYS[1], 'claimed', 1) == 0 then
+        return {-3, challenge[2]}
+    end
+    return {1, challenge[2]}
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return {-2, challenge[2]}
+end
+return {0, challenge[2]}
+"""
+_verify_challenge_script = RedisScript(_VERIFY_CHALLENGE_SCRIPT)
+
 
 class EmailRepository:
-    def __init__(self) -> None:
-        self.__init_email_api()
-
-    def __init_email_api(self) -> None:
-        """Initialize the email API client."""
-        configuration = sib_api_v3_sdk.Configuration()
-        configuration.api_key["api-key"] = os.getenv("API_KEY_EMAIL")
-        self.api_instance = sib_api_v3_sdk.TransactionalEmailsApi(
-            sib_api_v3_sdk.ApiClient(configuration)
-        )
-        logger.info("Email API client initialized.")
+    @staticmethod
+    def _challenge_key(email: str) -> str:
+        return f"email_challenge:{email}"
 
     async def _send_mail(
         self,
         to_email: str,
         subject: str,
-        html_content: str
+        template: str,
+        params: dict[str, str]
     ) -> dict:
-        send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-            to=[{"email": to_email}],
-            sender={"email": "no-reply@holdmybeer.fun", "name": "HoldMyBeer Fun"},
-            subject=subject,
-            html_content=html_content
-        )
-
+        """Queue an email for background delivery."""
         try:
-            self.api_instance.send_transac_email(send_smtp_email)
-            logger.info(f"Verification email sent to {to_email}.")
-            return {"status": "success", "message": "Verification email sent."}
+            message_id = await EmailQueue.enqueue(to_email, subject, template, params)
+            return {"status": "success", "message": "Email queued.", "message_id": message_id}
         except Exception as error:
-            logger.exception("Unexpected error during email challenge creation.: %s", error)
+            logger.exception("Unexpected error while queueing email: %s", error)
             return {"status": "error", "message": "Internal server error."}
 
+    async def send_mail(self, email: str, type_of_mail: str, value: str) -> dict:
+        """Queue a notification email rendered from a template."""
+        if type_of_mail == "new_password":
+            params = {"PASSWORD": value}
+            subject = "Your New Password"
+        else:
+            logger.error(f"Invalid mail type: {type_of_mail}")
+            return {"status": "error", "message": "Invalid mail type."}
+
+        return await self._send_mail(
+            to_email=email,
+            subject=subject,
+            template=type_of_mail,
+            params=params
+        )
+
     @staticmethod
     def _generate_code() -> str:
         """Generate a random 6-digit code."""
@@ -57,26 +81,26 @@ class EmailRepository:
         """Create and send a challenge code to the user's email."""
         code = self._generate_code()
 
-        if type_of_challenge == "register":
-            html = REGISTER_HTML_CODE.replace("{{CODE}}", code)
-        elif type_of_challenge == "reset_password":
-            html = RESET_PASSWORD_HTML_CODE.replace("{{CODE}}", code)
-        else:
+        if type_of_challenge not in ("register", "reset_password"):
             logger.error(f"Invalid challenge type: {type_of_challenge}")
             return {"status": "error", "message": "Invalid challenge type."}
 
-        await redis.setex(
-            f"challenge:{email}",
-            900,
-            json.dumps({"code": code, "email": email, "type_of_challenge": type_of_challenge})
-        )
+        async with get_redis().pipeline(transaction=True) as pipe:
+            pipe.delete(self._challenge_key(email))
+            pipe.hset(
+                self._challenge_key(email),
+                mapping={"code": code, "type_of_challenge": type_of_challenge, "attempts": 0}
+            )
+            pipe.expire(self._challenge_key(email), CHALLENGE_TTL)
+            await pipe.execute()
 
         logger.info(f"Challenge code {code} created for {email}.")
 
         return await self._send_mail(
             to_email=email,
             subject="Verification Code",
-            html_content=html
+            template=type_of_challenge,
+            params={"CODE": code}
         )
 
     @staticmethod
@@ -84,35 +108,47 @@ class EmailRepository:
         """Verify the challenge code provided by the user."""
         from ..auth import AuthService
 
-        challenge_data = await redis.get(f"challenge:{email}")
+        status, type_of_challenge = await _verify_challenge_script(
+            keys=[EmailRepository._challenge_key(email)],
+            args=[code, CHALLENGE_MAX_ATTEMPTS]
+        )
 
-        if not challenge_data:
+        if status == -1:
             logger.warning(f"Challenge expired or not found for {email}.")
             return {"status": "error", "message": "Challenge expired.", "code": 401}
 
-        try:
-            challenge = json.loads(challenge_data)
-        except json.JSONDecodeError:
-            logger.error(f"Corrupted challenge data for {email}.")
-            return {"status": "error", "message": "Internal server error.", "code": 500}
+        if status == -2:
+            logger.warning(f"Too many invalid challenge attempts for {email}, challenge discarded.")
+            return {"status": "error", "message": "Too many attempts, request a new code.", "code": 429}
 
-        if challenge.get("code") != code:
+        if status == 0:
             logger.warning(f"Invalid challenge code for {email}.")
             return {"status": "error", "message": "Invalid verification code.", "code": 400}
 
-        if challenge.get("type_of_challenge") == "register":
-            logger.info(f"User {email} is registering.")
-            await AuthService(database).after_email_verification(email)
-        elif challenge.get("type_of_challenge") == "reset_password":
-            logger.info(f"User {email} is resetting password.")
-            await AuthService(database).after_password_reset(email)
+        if status == -3:
+            logger.warning(f"Challenge for {email} is already being used.")
+            return {"status": "error", "message": "Verification already in progress.", "code": 409}
+
+        key = EmailRepository._challenge_key(email)
+        try:
+            if type_of_challenge == "register":
+                logger.info(f"User {email} is registering.")
+                await AuthService(database).after_email_verification(email)
+            elif type_of_challenge == "reset_password":
+                logger.info(f"User {email} is resetting password.")
+                await AuthService(database).after_password_reset(email)
+        except BaseException:
+            # Keep the code usable, nothing was verified
+            await get_redis().hdel(key, "claimed")
+            raise
+
+        await get_redis().delete(key)
 
-        await redis.delete(f"challenge:{email}")
-        logger.info(f"Email {email} successfully verified by {challenge.get('type_of_challenge')}.")
+        logger.info(f"Email {email} successfully verified by {type_of_challenge}.")
 
         return {
             "status": "success",
             "code": code,
             "email": email,
-            "type_of_challenge": challenge.get("type_of_challenge")
+            "type_of_challenge": type_of_challenge
         }
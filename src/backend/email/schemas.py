@@ -1,5 +1,7 @@
 from pydantic import BaseModel
 
+from ..fields import NormalizedEmail
+
 
 class EmailChallengeSchema(BaseModel):
     code: str
@@ -8,5 +10,5 @@ class EmailChallengeSchema(BaseModel):
 
 
 class EmailVerifyChallengeSchema(BaseModel):
-    email: str
+    email: NormalizedEmail
     code: str
@@ -23,6 +23,13 @@ class EmailService:
                 type_of_challenge=type_of_challenge
             )
 
+    async def send_mail(self, email: str, type_of_mail: str, value: str) -> None:
+        """ Function to queue a notification email """
+        result = await self.email_repository.send_mail(email, type_of_mail, value)
+
+        if result.get('status') == 'error':
+            raise HTTPException(status_code=400, detail=result['message'])
+
     async def verify_challenge(
         self,
         challenge: EmailVerifyChallengeSchema,
@@ -0,0 +1,239 @@
+import re
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional, Sequence
+
+from .html import TEMPLATES
+from ..settings import EmailSettings, get_settings
+
+logger = logging.getLogger(__name__)
+
+SENDER_EMAIL = get_settings().email.sender
+SENDER_NAME = get_settings().email.sender_name
+
+
+# Brevo accepts up to 1000 message versions in one request
+BREVO_MAX_VERSIONS = 1000
+
+_PLACEHOLDER = re.compile(r"\{\{([A-Z_]+)\}\}")
+
+
+@dataclass
+class EmailMessage:
+    to_email: str
+    subject: str
+    html_content: str
+    template: Optional[str] = None
+    params: dict[str, str] = field(default_factory=dict)
+
+
+class EmailTransport(ABC):
+    """Base class for the transports used to deliver outbound email"""
+
+    @abstractmethod
+    async def send(self, message: EmailMessage) -> None:
+        ...
+
+    async def send_batch(self, messages: Sequence[EmailMessage]) -> list[Optional[BaseException]]:
+        """Send several messages, returning the error of each one (None on success)"""
+        results = await asyncio.gather(*(self.send(message) for message in messages), return_exceptions=True)
+        return [result if isinstance(result, BaseException) else None for result in results]
+
+    async def close(self) -> None:
+        ...
+
+
+class BrevoTransport(EmailTransport):
+    """Brevo transactional API over a pooled keep-alive HTTP client"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.brevo.com/v3",
+        max_connections: int = 20,
+        timeout: float = 10.0,
+    ) -> None:
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"api-key": api_key, "accept": "application/json"},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=timeout,
+        )
+
+    async def send(self, message: EmailMessage) -> None:
+        response = await self.client.post(
+            "/smtp/email",
+            json={
+                "sender": {"email": SENDER_EMAIL, "name": SENDER_NAME},
+                "to": [{"email": message.to_email}],
+                "subject": message.subject,
+                "htmlContent": message.html_content,
+            },
+        )
+        response.raise_for_status()
+
+    @staticmethod
+    @lru_cache
+    def _versioned_template(template: str) -> str:
+        """Template HTML with {{NAME}} rewritten to Brevo's {{params.NAME}}"""
+        return _PLACEHOLDER.sub(r"{{params.\1}}", TEMPLATES[template])
+
+    async def _send_versions(self, messages: Sequence[EmailMessage]) -> None:
+        """One request carrying a message version per recipient"""
+        first = messages[0]
+        response = await self.client.post(
+            "/smtp/email",
+            json={
+                "sender": {"email": SENDER_EMAIL, "name": SENDER_NAME},
+                "subject": first.subject,
+                "htmlContent": self._versioned_template(first.template),
+                "messageVersions": [
+                    {"to": [{"email": message.to_email}], "params": message.params}
+                    for message in messages
+                ],
+            },
+        )
+        response.raise_for_status()
+
+    async def send_batch(self, messages: Sequence[EmailMessage]) -> list[Optional[BaseException]]:
+        """Group messages by template and subject and send each group in one request
+
+        A group rejected as a whole with a 4xx (one bad address poisons the
+        request) is retried one message at a time, so only the offending
+        recipients fail.
+        """
+        import httpx
+
+        results: list[Optional[BaseException]] = [None] * len(messages)
+        groups: dict[tuple[str, str], list[int]] = {}
+        singles: list[int] = []
+
+        for index, message in enumerate(messages):
+            if message.template in TEMPLATES:
+                groups.setdefault((message.template, message.subject), []).append(index)
+            else:
+                singles.append(index)
+
+        async def send_group(indexes: list[int]) -> None:
+            if len(indexes) == 1:
+                singles.append(indexes[0])
+                return
+            try:
+                await self._send_versions([messages[index] for index in indexes])
+            except httpx.HTTPStatusError as exc:
+                if 400 <= exc.response.status_code < 500 and exc.response.status_code != 429:
+                    logger.warning(f"Batch of {len(indexes)} emails rejected, retrying one by one: {exc}")
+                    singles.extend(indexes)
+                    return
+                for index in indexes:
+                    results[index] = exc
+            except Exception as exc:
+                for index in indexes:
+                    results[index] = exc
+
+        await asyncio.gather(*(
+            send_group(indexes[start:start + BREVO_MAX_VERSIONS])
+            for indexes in groups.values()
+            for start in range(0, len(indexes), BREVO_MAX_VERSIONS)
+        ))
+
+        if singles:
+            errors = await super().send_batch([messages[index] for index in singles])
+            for index, error in zip(singles, errors):
+                results[index] = error
+
+        return results
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class SMTPTransport(EmailTransport):
+    """Plain SMTP over one persistent connection"""
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        start_tls: bool = True,
+    ) -> None:
+        import aiosmtplib
+
+        self.client = aiosmtplib.SMTP(
+            hostname=hostname,
+            port=port,
+            username=username,
+            password=password,
+            use_tls=use_tls,
+            start_tls=start_tls,
+        )
+        self._lock = asyncio.Lock()
+
+    async def send(self, message: EmailMessage) -> None:
+        from email.message import EmailMessage as MIMEMessage
+
+        mime = MIMEMessage()
+        mime["From"] = f"{SENDER_NAME} <{SENDER_EMAIL}>"
+        mime["To"] = message.to_email
+        mime["Subject"] = message.subject
+        mime.set_content(message.html_content, subtype="html")
+
+        async with self._lock:
+            if not self.client.is_connected:
+                await self.client.connect()
+            await self.client.send_message(mime)
+
+    async def close(self) -> None:
+        if self.client.is_connected:
+            await self.client.quit()
+
+
+@dataclass
+class InMemoryTransport(EmailTransport):
+    """Keeps messages in memory, used by tests and benchmarks"""
+
+    outbox: list[EmailMessage] = field(default_factory=list)
+
+    async def send(self, message: EmailMessage) -> None:
+        self.outbox.append(message)
+
+
+def create_email_transport(
+    kind: Optional[str] = None,
+    settings: Optional[EmailSettings] = None,
+) -> EmailTransport:
+    """Build the transport selected by EMAIL_TRANSPORT"""
+    settings = settings or get_settings().email
+    kind = (kind or settings.transport).lower()
+
+    if kind == "brevo":
+        transport = BrevoTransport(
+            api_key=settings.api_key,
+            max_connections=settings.http_max_connections,
+            timeout=settings.http_timeout,
+        )
+    elif kind == "smtp":
+        transport = SMTPTransport(
+            hostname=settings.smtp_host,
+            port=settings.smtp_port,
+            username=settings.smtp_username,
+            password=settings.smtp_password,
+        )
+    elif kind == "memory":
+        transport = InMemoryTransport()
+    else:
+        raise RuntimeError(f"Unknown EMAIL_TRANSPORT: {kind}")
+
+    logger.info(f"Email transport initialized: {kind}.")
+    return transport
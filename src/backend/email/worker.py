@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import socket
+import random
+import asyncio
+import logging
+
+from .dispatcher import BatchingDispatcher
+from .html import render
+from .queue import EmailQueue, EMAIL_STREAM, EMAIL_CONSUMER_GROUP
+from .transport import EmailTransport, EmailMessage, create_email_transport
+from ..database import get_redis, init_redis, close_redis
+from ..settings import EmailSettings, get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class EmailDeliveryWorker:
+    """Drains the outbox stream and delivers messages through the email provider"""
+
+    def __init__(
+        self,
+        transport: EmailTransport,
+        concurrency: int = 64,
+        max_attempts: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        claim_idle_ms: int = 120_000,
+        batch_size: int = 50,
+        batch_window: float = 0.05,
+    ) -> None:
+        self.transport = transport
+        self.dispatcher = BatchingDispatcher(transport, max_batch=batch_size, max_delay=batch_window)
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.claim_idle_ms = claim_idle_ms
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+
+        self._running = False
+        self._last_reclaim = 0.0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_settings(cls, transport: EmailTransport, settings: EmailSettings) -> "EmailDeliveryWorker":
+        return cls(
+            transport,
+            concurrency=settings.worker_concurrency,
+            max_attempts=settings.max_attempts,
+            backoff_base=settings.backoff_base,
+            backoff_max=settings.backoff_max,
+            claim_idle_ms=settings.claim_idle_ms,
+            batch_size=settings.batch_size,
+            batch_window=settings.batch_window_ms / 1000,
+        )
+
+    async def _ensure_group(self) -> None:
+        """Create the consumer group if it does not exist yet"""
+        try:
+            await get_redis().xgroup_create(EMAIL_STREAM, EMAIL_CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    @staticmethod
+    def _message(fields: dict) -> EmailMessage:
+        """Build a message from a stream entry, rendering its template"""
+        if "template" not in fields:
+            # Entries queued before messages carried a template
+            return EmailMessage(fields["to_email"], fields["subject"], fields["html_content"])
+
+        params = json.loads(fields["params"])
+        return EmailMessage(
+            to_email=fields["to_email"],
+            subject=fields["subject"],
+            html_content=render(fields["template"], params),
+            template=fields["template"],
+            params=params,
+        )
+
+    async def _send(self, fields: dict) -> None:
+        """Deliver a message as part of the current batch"""
+        await self.dispatcher.send(self._message(fields))
+
+    @staticmethod
+    async def _ack(entry_id: str) -> None:
+        await get_redis().xack(EMAIL_STREAM, EMAIL_CONSUMER_GROUP, entry_id)
+        await get_redis().xdel(EMAIL_STREAM, entry_id)
+
+    async def _keep_claimed(self, entry_id: str) -> None:
+        """Reset the entry's idle time so xautoclaim does not hand it to another worker mid-retry"""
+        await get_redis().xclaim(EMAIL_STREAM, EMAIL_CONSUMER_GROUP, self.consumer, 0, [entry_id], justid=True)
+
+    async def _handle(self, entry_id: str, fields: dict) -> None:
+        """Deliver a message with retries, then acknowledge it
+
+        The entry is only acknowledged once it was delivered, dead-lettered or
+        found already delivered. If the worker is cancelled or Redis fails
+        midway, it stays pending and is reclaimed by xautoclaim.
+        """
+        message_id = fields.get("message_id", entry_id)
+        delivered_key = f"email:delivered:{message_id}"
+
+        try:
+            if await get_redis().exists(delivered_key):
+                logger.info(f"Email {message_id} already delivered, skipping.")
+                await self._ack(entry_id)
+                return
+
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    await self._send(fields)
+                    await get_redis().set(delivered_key, 1, ex=86400)
+                    logger.info(f"Email {message_id} sent to {fields.get('to_email')}.")
+                    break
+                except Exception as exc:
+                    if attempt == self.max_attempts:
+                        await EmailQueue.dead_letter(fields, repr(exc))
+                        break
+
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                    delay *= random.uniform(0.5, 1.5)
+                    logger.warning(
+                        f"Email {message_id} attempt {attempt} failed: {exc}. Retrying in {delay:.2f}s."
+                    )
+                    await self._keep_claimed(entry_id)
+                    await asyncio.sleep(delay)
+
+            await self._ack(entry_id)
+        finally:
+            self._slots.release()
+
+    def _spawn(self, entry_id: str, fields: dict) -> None:
+        task = asyncio.create_task(self._handle(entry_id, fields))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _reclaim_stale(self) -> None:
+        """Take over messages left pending by crashed consumers"""
+        if time.monotonic() - self._last_reclaim < self.claim_idle_ms / 2000:
+            return
+        self._last_reclaim = time.monotonic()
+
+        _, entries, *_ = await get_redis().xautoclaim(
+            EMAIL_STREAM,
+            EMAIL_CONSUMER_GROUP,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            start_id="0-0",
+            count=self.concurrency,
+        )
+
+        for entry_id, fields in entries:
+            if not fields:
+                continue
+            await self._slots.acquire()
+            self._spawn(entry_id, fields)
+
+    async def run(self) -> None:
+        """Consume the outbox until stopped"""
+        await self._ensure_group()
+        self._running = True
+        logger.info(f"Email worker {self.consumer} started.")
+
+        while self._running:
+            try:
+                await self._reclaim_stale()
+
+                await self._slots.acquire()
+                self._slots.release()
+
+                entries = await get_redis().xreadgroup(
+                    EMAIL_CONSUMER_GROUP,
+                    self.consumer,
+                    {EMAIL_STREAM: ">"},
+                    count=self.concurrency,
+                    block=1000,
+                )
+
+                for _, messages in entries or []:
+                    for entry_id, fields in messages:
+                        await self._slots.acquire()
+                        self._spawn(entry_id, fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email worker loop failed")
+                await asyncio.sleep(1)
+
+    async def stop(self) -> None:
+        """Stop consuming and wait for in-flight deliveries"""
+        self._running = False
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.dispatcher.close()
+        logger.info(f"Email worker {self.consumer} stopped.")
+
+
+async def main() -> None:
+    settings = get_settings()
+    init_redis(settings.redis)
+
+    transport = create_email_transport(settings=settings.email)
+    worker = EmailDeliveryWorker.from_settings(transport, settings.email)
+    try:
+        await worker.run()
+    finally:
+        await worker.stop()
+        await transport.close()
+        await close_redis()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    asyncio.run(main())
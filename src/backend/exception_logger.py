@@ -1,7 +1,20 @@
+import math
+
 from fastapi.responses import JSONResponse
 from fastapi.requests import Request
 
-from .auth import UserAlreadyExistsException, UserNotFoundException
+from .auth import UserAlreadyExistsException, UserNotFoundException, PasswordHashingUnavailableException
+from .ratelimit import RateLimitExceededException
+
+# Registered one by one so they are handled by ExceptionMiddleware, inside the
+# user middleware; a handler for Exception runs in ServerErrorMiddleware,
+# outside it, and Starlette re-raises after it runs
+DOMAIN_EXCEPTIONS = (
+    UserAlreadyExistsException,
+    UserNotFoundException,
+    PasswordHashingUnavailableException,
+    RateLimitExceededException,
+)
 
 
 async def custom_exception_handler(request: Request, exc: Exception):
@@ -15,6 +28,18 @@ async def custom_exception_handler(request: Request, exc: Exception):
             status_code=401,
             content={"message": "Incorrect email or password"},
         )
+    elif isinstance(exc, PasswordHashingUnavailableException):
+        return JSONResponse(
+            status_code=503,
+            content={"message": "Service is busy, please try again later"},
+            headers={"Retry-After": "1"},
+        )
+    elif isinstance(exc, RateLimitExceededException):
+        return JSONResponse(
+            status_code=429,
+            content={"message": "Too many requests"},
+            headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+        )
     else:
         return JSONResponse(
             status_code=500,
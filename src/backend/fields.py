@@ -0,0 +1,12 @@
+from typing import Annotated
+
+from pydantic import AfterValidator
+
+
+def normalize_email(email: str) -> str:
+    """Canonical form of an email, the one stored in users_base and used as a key"""
+    return email.strip().lower()
+
+
+# Request field for an email, normalized on input
+NormalizedEmail = Annotated[str, AfterValidator(normalize_email)]
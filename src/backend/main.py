@@ -1,32 +1,69 @@
-import os
+import time
 import logging
 from logging import basicConfig
+from typing import Optional
 
 from fastapi import FastAPI
-from dotenv import load_dotenv
-import sentry_sdk
 
-from .database import lifespan_check
-from .api import api_router
-from .exception_logger import custom_exception_handler
+from .settings import Settings, configure
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 
-sentry_sdk.init(
-    dsn=os.getenv("SENTRY_DSN"),
-    send_default_pii=True,
-)
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Build the application
 
-app = FastAPI(
-    title="Holdmybeer API",
-    description="Welcome to Holdmybeer API documentation!",
-    lifespan=lifespan_check,
-)
+    Settings are validated and installed before any feature module is imported,
+    so module-level singletons pick them up. Connections are only opened by the
+    lifespan, which keeps importing and building the app cheap.
+    """
+    started = time.perf_counter()
+    settings = configure((settings or Settings.from_env()).validate())
 
-app.add_exception_handler(Exception, custom_exception_handler)
-app.include_router(api_router, prefix="/api")
+    basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    if settings.sentry_dsn:
+        import sentry_sdk
+
+        sentry_sdk.init(
+            dsn=settings.sentry_dsn,
+            send_default_pii=True,
+        )
+
+    from .database import lifespan_check
+    from .api import api_router
+    from .exception_logger import DOMAIN_EXCEPTIONS, custom_exception_handler
+    from .metrics import APP_BOOT_SECONDS
+    from .monitoring import MetricsMiddleware, metrics_router, health_router
+
+    app = FastAPI(
+        title="Holdmybeer API",
+        description="Welcome to Holdmybeer API documentation!",
+        lifespan=lifespan_check,
+    )
+    app.state.settings = settings
+
+    app.add_middleware(MetricsMiddleware)
+    for exception in DOMAIN_EXCEPTIONS:
+        app.add_exception_handler(exception, custom_exception_handler)
+    app.add_exception_handler(Exception, custom_exception_handler)
+    app.include_router(api_router, prefix="/api")
+    app.include_router(metrics_router)
+    app.include_router(health_router)
+
+    elapsed = time.perf_counter() - started
+    APP_BOOT_SECONDS.set(elapsed)
+    logger.info(f"Application created in {elapsed * 1000:.1f} ms.")
+    return app
+
+
+def __getattr__(name: str):
+    # Keeps `uvicorn src.backend.main:app` working; prefer `--factory src.backend.main:create_app`
+    if name == "app":
+        app = create_app()
+        globals()["app"] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
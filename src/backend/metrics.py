@@ -0,0 +1,113 @@
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    REGISTRY,
+)
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+    buckets=LATENCY_BUCKETS,
+)
+
+USER_CACHE_LOOKUPS = Counter(
+    "user_cache_lookups_total",
+    "User cache lookups by result",
+    ("result",),
+)
+
+CACHE_FALLBACKS = Counter(
+    "cache_fallbacks_total",
+    "Cache operations skipped because Redis was slow, failing or behind an open circuit",
+    ("operation",),
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open",
+    ("name",),
+    multiprocess_mode="liveall",
+)
+
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds",
+    "Time spent hashing or verifying passwords, queueing included",
+    ("operation",),
+    buckets=LATENCY_BUCKETS,
+)
+PASSWORD_POOL_PENDING = Gauge(
+    "password_pool_pending",
+    "Password hashing jobs submitted and not finished",
+    multiprocess_mode="livesum",
+)
+
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "Time checkouts spent waiting for a connection from an exhausted pool",
+    buckets=LATENCY_BUCKETS,
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out",
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Database connections opened above the pool size",
+    multiprocess_mode="livesum",
+)
+
+EMAIL_SEND_DURATION = Histogram(
+    "email_send_duration_seconds",
+    "Email provider call latency",
+    ("transport",),
+    buckets=LATENCY_BUCKETS,
+)
+EMAIL_SEND_FAILURES = Counter(
+    "email_send_failures_total",
+    "Failed email delivery attempts",
+    ("transport",),
+)
+EMAIL_BATCH_SIZE = Histogram(
+    "email_batch_size",
+    "Messages sent per provider batch",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+EMAIL_DEAD_LETTERS = Counter(
+    "email_dead_letters_total",
+    "Emails moved to the dead-letter list",
+)
+
+APP_BOOT_SECONDS = Gauge(
+    "app_boot_seconds",
+    "Time spent in create_app, imports included",
+    multiprocess_mode="max",
+)
+
+WARMUP_STEP_SECONDS = Gauge(
+    "warmup_step_seconds",
+    "Time spent in each startup warm-up step",
+    ("step",),
+    multiprocess_mode="max",
+)
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Serialize every metric, aggregating across workers in multiprocess mode"""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
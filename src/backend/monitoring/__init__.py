@@ -0,0 +1,2 @@
+from .endpoints import monitoring_router, metrics_router, health_router
+from .middleware import MetricsMiddleware
@@ -0,0 +1,21 @@
+import hmac
+
+from fastapi import HTTPException, Request, status
+
+from ..settings import get_settings
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+async def require_monitoring_access(request: Request) -> None:
+    """Allow a request that carries MONITORING_TOKEN, or any local request when no token is set"""
+    token = get_settings().monitoring_token
+
+    if token:
+        scheme, _, supplied = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() == "bearer" and hmac.compare_digest(supplied.encode(), token.encode()):
+            return
+    elif request.client is not None and request.client.host in LOOPBACK_HOSTS:
+        return
+
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Monitoring access denied")
@@ -0,0 +1,58 @@
+import logging
+from typing import Any
+
+from fastapi import APIRouter, Depends, Response, status
+
+from ..auth.cache import user_cache
+from ..auth.existence import email_filter
+from ..database import pool_stats, replica_router, redis_breaker
+from .dependencies import require_monitoring_access
+from ..metrics import render_latest
+from ..ratelimit import rate_limiter
+from ..auth.hashing import password_pool
+from ..auth.last_login import last_login_buffer
+from ..auth.tokens import refresh_token_store
+from ..warmup import warmup
+
+logger = logging.getLogger(__name__)
+monitoring_router = APIRouter(tags=["monitoring"], dependencies=[Depends(require_monitoring_access)])
+metrics_router = APIRouter(tags=["monitoring"], dependencies=[Depends(require_monitoring_access)])
+health_router = APIRouter(tags=["monitoring"])
+
+
+@monitoring_router.get("/stats")
+async def stats() -> dict[str, Any]:
+    """Runtime numbers used to size worker pools per node"""
+    return {
+        "database_pool": pool_stats(),
+        "database_replicas": replica_router.stats(),
+        "redis_breaker": redis_breaker.stats(),
+        "password_pool": password_pool.stats(),
+        "user_cache": user_cache.stats(),
+        "email_filter": email_filter.stats(),
+        "last_login_buffer": last_login_buffer.stats(),
+        "refresh_tokens": refresh_token_store.stats(),
+        "rate_limiter": rate_limiter.stats(),
+        "warmup": warmup.stats(),
+    }
+
+
+@health_router.get("/live", include_in_schema=False)
+async def live() -> dict[str, str]:
+    """Liveness probe: the event loop is answering"""
+    return {"status": "ok"}
+
+
+@health_router.get("/ready", include_in_schema=False)
+async def ready(response: Response) -> dict[str, Any]:
+    """Readiness probe: 503 until warm-up has finished and again once shutdown starts"""
+    if not warmup.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return warmup.stats()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus metrics in text exposition format"""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
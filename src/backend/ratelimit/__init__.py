@@ -0,0 +1,3 @@
+from .exceptions import RateLimitExceededException
+from .limiter import rate_limiter, client_ip
+from .policies import RateLimitKey, RateLimitPolicy, ROUTE_POLICIES
@@ -0,0 +1,6 @@
+class RateLimitExceededException(Exception):
+    """Exception raised when a client goes over a rate limit."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
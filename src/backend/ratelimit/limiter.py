@@ -0,0 +1,162 @@
+import time
+import logging
+from typing import Any, Optional
+
+from fastapi import Request
+
+from .exceptions import RateLimitExceededException
+from .policies import RateLimitKey, RateLimitPolicy, ROUTE_POLICIES
+from ..database import LocalTTLCache, RedisScript, CircuitOpenError, redis_breaker
+from ..fields import normalize_email
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+# GCRA over every key of a route at once: the request is admitted only if all
+# keys admit it, and only then are their theoretical arrival times advanced.
+# ARGV holds (emission interval, burst tolerance) pairs in milliseconds.
+_GCRA_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local new_tats = {}
+local retry_after = 0
+local denied = 0
+
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[2 * i - 1])
+    local tolerance = tonumber(ARGV[2 * i])
+    local tat = tonumber(redis.call('GET', KEYS[i])) or now
+    if tat < now then
+        tat = now
+    end
+    local new_tat = tat + interval
+    local wait = new_tat - tolerance - now
+    if wait > retry_after then
+        retry_after = wait
+        denied = i
+    end
+    new_tats[i] = new_tat
+end
+
+if denied > 0 then
+    return {0, retry_after, denied}
+end
+
+for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], new_tats[i], 'PX', new_tats[i] - now)
+end
+return {1, 0, 0}
+"""
+
+TRUST_FORWARDED_FOR = get_settings().auth.trust_forwarded_for
+TRUSTED_PROXY_HOPS = max(get_settings().auth.trusted_proxy_hops, 1)
+
+
+def client_ip(request: Request) -> str:
+    """Client address, taken from X-Forwarded-For only behind a trusted proxy
+
+    Each proxy appends the address it received the request from, so only the
+    last TRUSTED_PROXY_HOPS entries were written by our own proxies; anything
+    left of them is whatever the client chose to send.
+    """
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            hops = [hop.strip() for hop in forwarded.split(",")]
+            return hops[max(len(hops) - TRUSTED_PROXY_HOPS, 0)]
+
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimiter:
+    """Per-route rate limits evaluated in one Redis round trip
+
+    Keys that Redis has already rejected are remembered locally until their
+    retry time passes, so clients hammering past their limit are turned away
+    without touching Redis. If Redis is unavailable the limiter fails open.
+    """
+
+    def __init__(self, blocked: LocalTTLCache) -> None:
+        self.blocked = blocked
+        self._script = RedisScript(_GCRA_SCRIPT)
+        self.allowed = 0
+        self.denied = 0
+        self.denied_locally = 0
+        self.failed_open = 0
+
+    @staticmethod
+    def _key(route: str, policy: RateLimitPolicy, ip: str, email: Optional[str]) -> Optional[str]:
+        if policy.key is RateLimitKey.IP:
+            identity = ip
+        elif email is None:
+            return None
+        elif policy.key is RateLimitKey.EMAIL:
+            identity = email
+        else:
+            identity = f"{email}|{ip}"
+
+        return f"ratelimit:{route}:{policy.key.value}:{identity}"
+
+    async def hit(self, route: str, request: Request, email: Optional[str] = None) -> None:
+        """Count a request against the route's policies or raise RateLimitExceededException"""
+        ip = client_ip(request)
+        email = normalize_email(email) if email else None
+
+        policies, keys = [], []
+        for policy in ROUTE_POLICIES[route]:
+            key = self._key(route, policy, ip, email)
+            if key is not None:
+                policies.append(policy)
+                keys.append(key)
+
+        now = time.monotonic()
+        for key in keys:
+            blocked_until = self.blocked.get(key)
+            if blocked_until is not None and blocked_until > now:
+                self.denied_locally += 1
+                raise RateLimitExceededException(blocked_until - now)
+
+        args = []
+        for policy in policies:
+            interval = policy.period * 1000 / policy.limit
+            args.extend((int(interval), int(policy.period * 1000)))
+
+        try:
+            allowed, retry_after_ms, denied_index = await redis_breaker.call(
+                lambda: self._script(keys=keys, args=args)
+            )
+        except CircuitOpenError:
+            self.failed_open += 1
+            return
+        except Exception:
+            self.failed_open += 1
+            logger.exception(f"Rate limiter unavailable for {route}, allowing request")
+            return
+
+        if allowed:
+            self.allowed += 1
+            return
+
+        self.denied += 1
+        retry_after = int(retry_after_ms) / 1000
+        denied_key = keys[int(denied_index) - 1]
+        self.blocked.set(denied_key, now + retry_after, ttl=retry_after)
+        logger.warning(f"Rate limit exceeded for {denied_key}, retry after {retry_after:.1f}s")
+        raise RateLimitExceededException(retry_after)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "allowed": self.allowed,
+            "denied": self.denied,
+            "denied_locally": self.denied_locally,
+            "failed_open": self.failed_open,
+            "blocked_keys": len(self.blocked),
+        }
+
+
+rate_limiter = RateLimiter(
+    LocalTTLCache(
+        maxsize=get_settings().auth.rate_limit_local_blocklist_size,
+        ttl=60,
+    )
+)
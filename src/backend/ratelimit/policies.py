@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from enum import Enum
+
+
+class RateLimitKey(Enum):
+    """What a rate limit is counted against."""
+
+    IP = "ip"
+    EMAIL = "email"
+    EMAIL_IP = "email_ip"
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """At most ``limit`` requests per ``period`` seconds for one key."""
+
+    key: RateLimitKey
+    limit: int
+    period: float
+
+
+ROUTE_POLICIES: dict[str, tuple[RateLimitPolicy, ...]] = {
+    "login": (
+        RateLimitPolicy(RateLimitKey.IP, limit=30, period=60),
+        RateLimitPolicy(RateLimitKey.EMAIL, limit=20, period=15 * 60),
+        RateLimitPolicy(RateLimitKey.EMAIL_IP, limit=5, period=60),
+    ),
+    "register": (
+        RateLimitPolicy(RateLimitKey.IP, limit=10, period=60 * 60),
+        RateLimitPolicy(RateLimitKey.EMAIL, limit=3, period=60 * 60),
+    ),
+    "reset_password": (
+        RateLimitPolicy(RateLimitKey.IP, limit=10, period=60 * 60),
+        RateLimitPolicy(RateLimitKey.EMAIL, limit=3, period=60 * 60),
+    ),
+    "email_challenge": (
+        RateLimitPolicy(RateLimitKey.IP, limit=30, period=15 * 60),
+        RateLimitPolicy(RateLimitKey.EMAIL, limit=10, period=15 * 60),
+    ),
+}
@@ -0,0 +1,171 @@
+import os
+from dataclasses import dataclass, field, fields
+from functools import lru_cache
+from typing import Any, Optional, Union, get_args, get_origin, get_type_hints
+
+from dotenv import load_dotenv
+
+
+def _coerce(raw: str, annotation: Any) -> Any:
+    if get_origin(annotation) is Union:
+        annotation = next(arg for arg in get_args(annotation) if arg is not type(None))
+    if annotation is bool:
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if annotation in (int, float):
+        return annotation(raw)
+    return raw
+
+
+def _from_env(cls, prefix: str = ""):
+    """Build a settings section from environment variables named PREFIX + FIELD"""
+    hints = get_type_hints(cls)
+    values = {}
+
+    for item in fields(cls):
+        if item.metadata.get("section"):
+            values[item.name] = _from_env(hints[item.name], item.metadata.get("prefix", ""))
+            continue
+
+        raw = os.getenv(item.metadata.get("env", prefix + item.name.upper()))
+        if raw is not None and raw != "":
+            values[item.name] = _coerce(raw, hints[item.name])
+
+    return cls(**values)
+
+
+def _section(cls, prefix: str = ""):
+    return field(default_factory=cls, metadata={"section": True, "prefix": prefix})
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """Connection pool settings for the Postgres engine"""
+
+    url: str = ""
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 10.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 500
+    prewarm_connections: int = 5
+    replica_urls: str = ""
+    replica_max_lag: float = 5.0
+    replica_check_interval: float = 5.0
+
+
+@dataclass(frozen=True)
+class RedisSettings:
+    url: str = ""
+    socket_timeout: float = 5.0
+    socket_connect_timeout: float = 1.0
+    operation_timeout: float = 0.1
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 5.0
+    prewarm_connections: int = 5
+
+
+@dataclass(frozen=True)
+class AuthSettings:
+    secret_key: str = ""
+    password_pool_size: int = field(default_factory=lambda: os.cpu_count() or 1)
+    password_pool_queue_size: int = 64
+    password_hash_timeout: float = 5.0
+    password_hash_rounds: Optional[int] = None
+    password_hash_target_ms: float = 250.0
+    password_hash_min_rounds: int = 10
+    password_hash_max_rounds: int = 14
+    token_cache_size: int = 10_000
+    token_cache_ttl: float = 60.0
+    user_cache_local_size: int = 10_000
+    user_cache_local_ttl: float = 5.0
+    user_cache_soft_ttl: float = 240.0
+    user_cache_ttl: float = 300.0
+    user_cache_ttl_jitter: float = 0.1
+    user_cache_lock_ttl_ms: int = 2000
+    user_cache_negative_ttl: float = 30.0
+    email_filter_capacity: int = 1_000_000
+    email_filter_error_rate: float = 0.01
+    email_filter_rebuild_interval: float = 3600.0
+    last_login_batch_size: int = 500
+    last_login_flush_interval: float = 5.0
+    last_login_max_staleness: float = 30.0
+    revocation_filter_capacity: int = 100_000
+    revocation_filter_error_rate: float = 0.001
+    revocation_filter_rebuild_interval: float = 600.0
+    trust_forwarded_for: bool = False
+    trusted_proxy_hops: int = 1
+    rate_limit_local_blocklist_size: int = 100_000
+
+
+@dataclass(frozen=True)
+class EmailSettings:
+    transport: str = "brevo"
+    api_key: str = field(default="", metadata={"env": "API_KEY_EMAIL"})
+    sender: str = "no-reply@holdmybeer.fun"
+    sender_name: str = "HoldMyBeer Fun"
+    http_max_connections: int = 20
+    http_timeout: float = 10.0
+    smtp_host: str = field(default="localhost", metadata={"env": "SMTP_HOST"})
+    smtp_port: int = field(default=587, metadata={"env": "SMTP_PORT"})
+    smtp_username: Optional[str] = field(default=None, metadata={"env": "SMTP_USERNAME"})
+    smtp_password: Optional[str] = field(default=None, metadata={"env": "SMTP_PASSWORD"})
+    stream: str = "email:outbox"
+    dead_letter: str = "email:dead"
+    dead_letter_max_length: int = 10_000
+    worker_in_process: bool = False
+    worker_concurrency: int = 64
+    batch_size: int = 50
+    batch_window_ms: float = 50.0
+    max_attempts: int = 5
+    backoff_base: float = 0.5
+    backoff_max: float = 30.0
+    claim_idle_ms: int = 120_000
+    challenge_max_attempts: int = field(default=5, metadata={"env": "CHALLENGE_MAX_ATTEMPTS"})
+
+
+@dataclass(frozen=True)
+class Settings:
+    """Application settings, read from the environment once per process"""
+
+    database: DatabaseSettings = _section(DatabaseSettings, "DATABASE_")
+    redis: RedisSettings = _section(RedisSettings, "REDIS_")
+    auth: AuthSettings = _section(AuthSettings)
+    email: EmailSettings = _section(EmailSettings, "EMAIL_")
+    sentry_dsn: Optional[str] = None
+    monitoring_token: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        load_dotenv()
+        return _from_env(cls)
+
+    def validate(self) -> "Settings":
+        """Fail fast on settings the running app cannot do without"""
+        missing = [
+            name for name, value in (
+                ("DATABASE_URL", self.database.url),
+                ("REDIS_URL", self.redis.url),
+                ("SECRET_KEY", self.auth.secret_key),
+            )
+            if not value
+        ]
+        if missing:
+            raise RuntimeError(f"Missing required settings: {', '.join(missing)}")
+        return self
+
+
+_configured: Optional[Settings] = None
+
+
+def configure(settings: Settings) -> Settings:
+    """Install the settings used by modules imported from now on"""
+    global _configured
+    _configured = settings
+    get_settings.cache_clear()
+    return settings
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return _configured or Settings.from_env()
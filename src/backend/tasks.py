@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from typing import Coroutine, Any
+
+logger = logging.getLogger(__name__)
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro: Coroutine[Any, Any, Any], name: str | None = None) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference and logging failures"""
+    task = asyncio.create_task(coro, name=name)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _background_tasks.discard(task)
+
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task {task.get_name()} failed", exc_info=task.exception())
+
+
+async def drain(timeout: float = 5.0) -> None:
+    """Wait for pending background tasks during shutdown"""
+    if not _background_tasks:
+        return
+
+    _, pending = await asyncio.wait(set(_background_tasks), timeout=timeout)
+    for task in pending:
+        task.cancel()
@@ -0,0 +1,268 @@
+"""Bulk user import and export.
+
+    python -m src.backend.tools.users import users.csv --checkpoint users.ckpt
+    python -m src.backend.tools.users export users.ndjson
+
+Import streams CSV or NDJSON rows with ``email`` and either ``password``
+(plaintext, hashed across a process pool) or ``hash_password`` (an existing
+bcrypt hash). Rows are loaded with COPY into a temporary table and merged
+into users_base per batch; after every committed batch the checkpoint file
+records how many input rows are done, so a rerun resumes where it stopped.
+"""
+import os
+import sys
+import csv
+import json
+import asyncio
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Iterator, Optional, TextIO
+
+import asyncpg
+
+from ..auth.enums import UserPermissionRole, UserVerificationStatus
+from ..auth.cache import user_cache
+from ..auth.existence import email_filter
+from ..auth.hashing import hash_password_sync
+from ..fields import normalize_email
+from ..database import init_redis, close_redis
+from ..settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("email", "hash_password", "is_banned", "permissions", "verification_status", "created_at")
+EXPORT_COLUMNS = ("id", "email", "hash_password", "is_banned", "permissions", "verification_status", "created_at", "last_login")
+
+# An email repeated within a batch keeps its last row; ON CONFLICT DO UPDATE
+# cannot touch the same row twice in one statement
+_MERGE_SQL = {
+    "skip": """
+        INSERT INTO users_base ({columns})
+        SELECT DISTINCT ON (email) {columns} FROM users_import ORDER BY email, ctid DESC
+        ON CONFLICT (lower(email)) DO NOTHING
+        RETURNING email
+    """,
+    "update": """
+        INSERT INTO users_base ({columns})
+        SELECT DISTINCT ON (email) {columns} FROM users_import ORDER BY email, ctid DESC
+        ON CONFLICT (lower(email)) DO UPDATE SET hash_password = EXCLUDED.hash_password
+        RETURNING email
+    """,
+}
+
+
+def _dsn() -> str:
+    url = get_settings().database.url
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set.")
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+def _detect_format(path: str, explicit: Optional[str]) -> str:
+    if explicit:
+        return explicit
+    return "ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def _read_rows(stream: TextIO, fmt: str) -> Iterator[dict[str, Any]]:
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _parse_bool(value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "t")
+
+
+def _parse_datetime(value: Any) -> datetime:
+    if not value:
+        return datetime.now(timezone.utc)
+    parsed = datetime.fromisoformat(str(value))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _load_checkpoint(path: Optional[str]) -> int:
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as file:
+        return int(json.load(file)["rows"])
+
+
+def _save_checkpoint(path: Optional[str], rows: int) -> None:
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump({"rows": rows, "updated_at": datetime.now(timezone.utc).isoformat()}, file)
+    os.replace(tmp_path, path)
+
+
+def _prepare_batch(rows: list[dict[str, Any]], pool: ProcessPoolExecutor, workers: int) -> list[tuple]:
+    """Turn input rows into COPY records, hashing plaintext passwords in parallel"""
+    plaintext = [row["password"] for row in rows if not row.get("hash_password")]
+    chunksize = max(1, len(plaintext) // (workers * 4))
+    hashes = iter(pool.map(hash_password_sync, plaintext, chunksize=chunksize))
+
+    records = []
+    for row in rows:
+        hash_password = row.get("hash_password")
+        if not hash_password:
+            hash_password = next(hashes)
+        elif not hash_password.startswith("$2"):
+            raise ValueError(f"Unsupported password hash for {row['email']}")
+
+        records.append((
+            normalize_email(row["email"]),
+            hash_password,
+            _parse_bool(row.get("is_banned", False)),
+            int(row.get("permissions") or UserPermissionRole.USER.value),
+            int(row.get("verification_status") or UserVerificationStatus.NOT_CONFIRMED.value),
+            _parse_datetime(row.get("created_at")),
+        ))
+
+    return records
+
+
+async def _copy_batch(conn: asyncpg.Connection, records: list[tuple], on_conflict: str) -> list[str]:
+    """COPY a batch into a temporary table and merge it into users_base, returning the emails written"""
+    columns = ", ".join(COLUMNS)
+
+    async with conn.transaction():
+        await conn.execute(
+            "CREATE TEMP TABLE users_import (LIKE users_base INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        await conn.copy_records_to_table("users_import", records=records, columns=COLUMNS)
+        written = await conn.fetch(_MERGE_SQL[on_conflict].format(columns=columns))
+
+    return [record["email"] for record in written]
+
+
+async def import_users(
+    path: str,
+    fmt: Optional[str],
+    batch_size: int,
+    workers: int,
+    checkpoint: Optional[str],
+    on_conflict: str,
+) -> None:
+    fmt = _detect_format(path, fmt)
+    done = _load_checkpoint(checkpoint)
+    loop = asyncio.get_running_loop()
+
+    if done:
+        logger.info(f"Resuming import after {done} rows")
+
+    inserted = 0
+    init_redis(get_settings().redis)
+    conn = await asyncpg.connect(_dsn())
+    try:
+        with open(path, newline="") as stream, ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = islice(_read_rows(stream, fmt), done, None)
+
+            def next_batch() -> list[tuple]:
+                return _prepare_batch(list(islice(rows, batch_size)), pool, workers)
+
+            pending = loop.run_in_executor(None, next_batch)
+            while True:
+                records = await pending
+                if not records:
+                    break
+
+                # hash the next batch while this one is being copied
+                pending = loop.run_in_executor(None, next_batch)
+                emails = await _copy_batch(conn, records, on_conflict)
+                inserted += len(emails)
+                # Cached copies (or cached "not registered" answers) are now wrong
+                await user_cache.invalidate_many(emails)
+                done += len(records)
+                _save_checkpoint(checkpoint, done)
+                logger.info(f"Processed {done} rows, {inserted} users written")
+    finally:
+        await conn.close()
+        # Imported emails are not in the shared existence filter, even when
+        # the import stopped half way; make every worker rebuild it
+        if inserted:
+            try:
+                await email_filter.reset_shared()
+            except Exception:
+                logger.exception("Failed to reset the email filter, run the import again or wait for the next rebuild")
+        await close_redis()
+
+    logger.info(f"Import finished: {done} rows processed, {inserted} users written")
+
+
+async def export_users(path: str, fmt: Optional[str], batch_size: int, include_hashes: bool) -> None:
+    fmt = _detect_format(path, fmt)
+    columns = [column for column in EXPORT_COLUMNS if include_hashes or column != "hash_password"]
+    exported = 0
+
+    conn = await asyncpg.connect(_dsn())
+    try:
+        stream = sys.stdout if path == "-" else open(path, "w", newline="")
+        try:
+            writer = csv.writer(stream) if fmt == "csv" else None
+            if writer:
+                writer.writerow(columns)
+
+            async with conn.transaction(readonly=True):
+                query = f"SELECT {', '.join(columns)} FROM users_base ORDER BY id"
+                async for record in conn.cursor(query, prefetch=batch_size):
+                    values = [
+                        record[column].isoformat() if isinstance(record[column], datetime) else record[column]
+                        for column in columns
+                    ]
+                    if writer:
+                        writer.writerow(values)
+                    else:
+                        stream.write(json.dumps(dict(zip(columns, values))) + "\n")
+                    exported += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+    finally:
+        await conn.close()
+
+    logger.info(f"Export finished: {exported} users written")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m src.backend.tools.users", description="Bulk user import and export")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Load users from a CSV or NDJSON file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=("csv", "ndjson"))
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    import_parser.add_argument("--checkpoint", help="File used to resume an interrupted import")
+    import_parser.add_argument("--on-conflict", choices=tuple(_MERGE_SQL), default="skip")
+
+    export_parser = commands.add_parser("export", help="Stream users to a CSV or NDJSON file ('-' for stdout)")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=("csv", "ndjson"))
+    export_parser.add_argument("--batch-size", type=int, default=5000)
+    export_parser.add_argument("--no-hashes", action="store_true", help="Leave password hashes out")
+
+    args = parser.parse_args()
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        stream=sys.stderr,
+    )
+
+    if args.command == "import":
+        asyncio.run(import_users(args.path, args.format, args.batch_size, args.workers, args.checkpoint, args.on_conflict))
+    else:
+        asyncio.run(export_users(args.path, args.format, args.batch_size, not args.no_hashes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import time
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from .metrics import WARMUP_STEP_SECONDS
+
+logger = logging.getLogger(__name__)
+
+WarmupStep = Callable[[], Awaitable[Any]]
+
+RETRY_DELAY = 1.0
+RETRY_DELAY_MAX = 30.0
+
+
+class WarmupPipeline:
+    """Named steps that pay the first-request costs before the worker reports ready
+
+    Steps run in registration order in a background task started by the
+    lifespan, so the worker is alive but not ready while they run. A failing
+    optional step is logged and skipped, it only moves cost off the first
+    requests. A failing required step means the worker cannot serve them: it
+    is retried with backoff and the worker stays not ready until it passes.
+    """
+
+    def __init__(self) -> None:
+        self._steps: dict[str, WarmupStep] = {}
+        self._required: set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+        self.durations: dict[str, float] = {}
+        self.failed: list[str] = []
+
+    def register(self, name: str, step: WarmupStep, required: bool = False) -> None:
+        """Add a step, replacing any step already registered under the name"""
+        self._steps[name] = step
+        if required:
+            self._required.add(name)
+        else:
+            self._required.discard(name)
+
+    async def _run_step(self, name: str, step: WarmupStep) -> None:
+        delay = RETRY_DELAY
+        while True:
+            step_started = time.perf_counter()
+            try:
+                await step()
+            except Exception:
+                if name not in self.failed:
+                    self.failed.append(name)
+                if name not in self._required:
+                    logger.exception(f"Warm-up step {name} failed")
+                    return
+                logger.exception(f"Required warm-up step {name} failed, retrying in {delay:.0f}s")
+            else:
+                if name in self.failed:
+                    self.failed.remove(name)
+                return
+            finally:
+                self.durations[name] = time.perf_counter() - step_started
+                WARMUP_STEP_SECONDS.labels(name).set(self.durations[name])
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_DELAY_MAX)
+
+    async def run(self) -> None:
+        started = time.perf_counter()
+
+        for name, step in self._steps.items():
+            await self._run_step(name, step)
+
+        self.ready = True
+        logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms, worker is ready.")
+
+    def start(self) -> None:
+        if self._task is None:
+            self.ready = False
+            self.durations, self.failed = {}, []
+            self._task = asyncio.create_task(self.run(), name="warmup")
+
+    async def stop(self) -> None:
+        """Report not ready again, so load balancers stop routing here while shutting down"""
+        self.ready = False
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "steps": list(self._steps),
+            "required": sorted(self._required),
+            "durations_seconds": self.durations,
+            "failed": self.failed,
+        }
+
+
+warmup = WarmupPipeline()